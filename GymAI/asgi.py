@@ -2,6 +2,10 @@
 ASGI config for GymAI project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server so async views such as ``chat_api`` wait on the
+event loop instead of holding a worker:
+
+    uvicorn GymAI.asgi:application --workers 2
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
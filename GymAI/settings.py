@@ -38,10 +38,12 @@ CSRF_TRUSTED_ORIGINS = [
 
 
 # Application definition
+# Shared by every worker process on the host and kept across restarts
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "coach-ai-cache",
+        "BACKEND": "GymAI.sqlite_cache.SQLiteCache",
+        "LOCATION": os.getenv("DJANGO_CACHE_PATH", BASE_DIR / "django_cache.sqlite3"),
+        "OPTIONS": {"MAX_ENTRIES": 20000},
     }
 }
 
@@ -139,4 +141,28 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
-DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
\ No newline at end of file
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Coach Bot chat context
+# The newest CHAT_HISTORY_MAX_MESSAGES exchanges are sent verbatim; once
+# CHAT_MEMORY_FOLD_BATCH more pile up behind them they are folded into the
+# user's rolling summary.
+CHAT_HISTORY_MAX_MESSAGES = 6
+CHAT_MEMORY_FOLD_BATCH = 4
+CHAT_HISTORY_TOKEN_BUDGET = 1500
+
+# Plan generation jobs (run with `python manage.py run_plan_worker`)
+# PLAN_JOBS_EAGER runs jobs inline in the request, for setups without a worker.
+PLAN_JOBS_EAGER = os.getenv("PLAN_JOBS_EAGER", "0") == "1"
+PLAN_JOBS_VISIBILITY_TIMEOUT = 180
+PLAN_JOBS_RETRY_DELAY = 30
+
+# "single": the whole nutrition week in one completion. "fanout": daily
+# targets first, then the seven days as parallel smaller completions
+# (see `manage.py bench_nutrition_generation`).
+NUTRITION_GENERATION_MODE = os.getenv("NUTRITION_GENERATION_MODE", "single")
+
+# Plan history retention: `manage.py compact_plans` archives all but the
+# newest PLAN_HISTORY_KEEP plans of each type per user (current plans are
+# always kept) into the compressed PlanArchive table.
+PLAN_HISTORY_KEEP = int(os.getenv("PLAN_HISTORY_KEEP", "5"))
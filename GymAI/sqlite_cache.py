@@ -0,0 +1,191 @@
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Reads refresh an entry's LRU timestamp at most this often, so hot keys
+# don't turn every cache hit into a write
+TOUCH_INTERVAL = 60
+
+
+class SQLiteCache(BaseCache):
+    """
+    Django cache backend in a local SQLite file (WAL mode), shared by all
+    worker processes on the host and kept across restarts. add() and incr()
+    are atomic across processes, so the cache can hold locks and counters.
+    Expired entries are dropped on write, then the least recently used ones
+    once the table grows past MAX_ENTRIES.
+
+        CACHES = {"default": {
+            "BACKEND": "GymAI.sqlite_cache.SQLiteCache",
+            "LOCATION": BASE_DIR / "django_cache.sqlite3",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }}
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = str(location)
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS django_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " expires_at REAL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS django_cache_accessed_at"
+                " ON django_cache (accessed_at)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _expires_at(self, timeout):
+        # None means never; 0 or less means already expired
+        return self.get_backend_timeout(timeout)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM django_cache WHERE expires_at <= ?", (now,))
+        (size,) = conn.execute("SELECT COUNT(*) FROM django_cache").fetchone()
+        overflow = size - self._max_entries
+        if overflow > 0:
+            # Cull a fraction past the limit, like Django's own backends,
+            # so a full cache doesn't evict on every write
+            overflow += self._max_entries // self._cull_frequency
+            conn.execute(
+                "DELETE FROM django_cache WHERE key IN ("
+                " SELECT key FROM django_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM django_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            return default
+
+        if now - row[2] > TOUCH_INTERVAL:
+            conn.execute("UPDATE django_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(k, version=version): k for k in keys}
+        if not key_map:
+            return {}
+        placeholders = ",".join("?" * len(key_map))
+        rows = self._connect().execute(
+            f"SELECT key, value FROM django_cache WHERE key IN ({placeholders})"
+            " AND (expires_at IS NULL OR expires_at > ?)",
+            (*key_map, time.time()),
+        ).fetchall()
+        return {key_map[key]: pickle.loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires_at = self._expires_at(timeout)
+        now = time.time()
+        rows = [
+            (
+                self.make_and_validate_key(key, version=version),
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                expires_at,
+                now,
+            )
+            for key, value in data.items()
+        ]
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO django_cache (key, value, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict(conn, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Store only if key is absent or expired; True if stored. Atomic."""
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO django_cache (key, value, expires_at, accessed_at)"
+            " VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET"
+            "  value = excluded.value,"
+            "  expires_at = excluded.expires_at,"
+            "  accessed_at = excluded.accessed_at"
+            " WHERE django_cache.expires_at IS NOT NULL AND django_cache.expires_at <= ?",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._expires_at(timeout), now, now),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        """Atomic read-modify-write under SQLite's write lock."""
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT value FROM django_cache WHERE key = ?"
+                " AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            conn.execute(
+                "UPDATE django_cache SET value = ? WHERE key = ?",
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connect().execute(
+            "UPDATE django_cache SET expires_at = ? WHERE key = ?"
+            " AND (expires_at IS NULL OR expires_at > ?)",
+            (self._expires_at(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connect().execute(
+            "SELECT 1 FROM django_cache WHERE key = ?"
+            " AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connect().execute("DELETE FROM django_cache WHERE key = ?", (key,))
+        return cursor.rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(k, version=version) for k in keys]
+        if keys:
+            placeholders = ",".join("?" * len(keys))
+            self._connect().execute(
+                f"DELETE FROM django_cache WHERE key IN ({placeholders})", keys
+            )
+
+    def clear(self):
+        self._connect().execute("DELETE FROM django_cache")
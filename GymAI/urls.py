@@ -18,6 +18,10 @@ urlpatterns = [
     path("dashboard/chat/", views_dashboard.chat_view, name="chat"),
     path("dashboard/progress/", views_dashboard.progress_view, name="progress"),
     path("api/chat/", views.chat_api, name="chat_api"),
+    path("api/chat/stream/", views.chat_stream_api, name="chat_stream_api"),
+    path("api/plans/<str:plan_type>/day/", views.plan_day_api, name="plan_day_api"),
+    path("api/plans/jobs/<int:job_id>/", views.plan_job_status_api, name="plan_job_status_api"),
+    path("api/metrics/llm/", views.llm_metrics_api, name="llm_metrics_api"),
     path("api/progress/update/", views_dashboard.update_progress, name="update_progress"),
     path("api/progress/note/", views_dashboard.save_progress_note, name="save_progress_note"),
     path("dashboard/photo-locker/", views_dashboard.photo_locker_view, name="photo_locker"),
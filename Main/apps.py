@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "Main"
+
+    def ready(self):
+        import Main.signals  # noqa: F401
+        from wrappers.llm_metrics import metrics
+        from Main.models import TokenUsage
+
+        metrics.add_sink(TokenUsage.record_call)
@@ -0,0 +1,142 @@
+import json
+import re
+
+from django.conf import settings
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Questions about the week as a whole get every day, still compacted. Words
+# like "plan" or "schedule" don't count: nearly every message uses them.
+WHOLE_WEEK_WORDS = re.compile(r"\b(week|weekly|split|all days|every day)\b", re.I)
+
+
+def estimate_tokens(text):
+    """Local token estimate (~4 characters per token), no tokenizer needed."""
+    return (len(text) + 3) // 4
+
+
+def _compact(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def _prune(value):
+    """Drop nulls and empty strings/lists; they cost tokens and say nothing."""
+    if isinstance(value, dict):
+        return {k: _prune(v) for k, v in value.items() if v not in (None, "", [])}
+    if isinstance(value, list):
+        return [_prune(v) for v in value]
+    return value
+
+
+def relevant_days(user_message, today):
+    """Weekday names worth sending for this message: today, tomorrow if
+    asked, any day named in the message, or the whole week."""
+    if WHOLE_WEEK_WORDS.search(user_message):
+        return list(WEEKDAYS)
+
+    index = WEEKDAYS.index(today)
+    days = [today]
+    lowered = user_message.lower()
+    if "tomorrow" in lowered:
+        days.append(WEEKDAYS[(index + 1) % 7])
+    if "yesterday" in lowered:
+        days.append(WEEKDAYS[(index - 1) % 7])
+    for day in WEEKDAYS:
+        if day.lower() in lowered and day not in days:
+            days.append(day)
+    return days
+
+
+def _select_days(week_plan, days):
+    wanted = {d.lower() for d in days}
+    return [d for d in week_plan if str(d.get("day", "")).strip().lower() in wanted]
+
+
+def compact_workout(plan_data, days):
+    if not isinstance(plan_data, dict):
+        return "None saved yet."
+
+    week_plan = plan_data.get("week_plan", [])
+    # One-line outline of the whole week, details only for the selected days
+    outline = ", ".join(
+        f"{str(d.get('day') or '?')[:3]}={d.get('focus', '?')}" for d in week_plan
+    )
+    details = _compact(_prune(_select_days(week_plan, days)))
+    return f"Week: {outline}\nDetails: {details}"
+
+
+def compact_nutrition(plan_data, days):
+    if not isinstance(plan_data, dict):
+        return "None saved yet."
+
+    targets = _compact(plan_data.get("daily_targets", {}))
+    details = []
+    for day in _select_days(plan_data.get("week_plan", []), days):
+        meals = [
+            {
+                "name": meal.get("name"),
+                "items": [
+                    f"{item.get('food')} ({item.get('portion')}, {item.get('calories')} kcal, "
+                    f"P{item.get('protein_g')}/C{item.get('carbs_g')}/F{item.get('fat_g')})"
+                    for item in meal.get("items", [])
+                ],
+            }
+            for meal in day.get("meals", [])
+        ]
+        details.append(
+            _prune({
+                "day": day.get("day"),
+                "meals": meals,
+                "total_kcal": day.get("day_total_calories"),
+                "notes": day.get("notes"),
+            })
+        )
+    return f"Targets: {targets}\nDetails: {_compact(details)}"
+
+
+def trim_history(pairs, budget):
+    """
+    Keep the newest (message, response) pairs that fit in budget tokens.
+    pairs are oldest-first; returns chat messages oldest-first.
+    """
+    kept = []
+    used = 0
+    for message, response in reversed(pairs):
+        cost = estimate_tokens(message) + estimate_tokens(response)
+        if used + cost > budget and kept:
+            break
+        kept.append((message, response))
+        used += cost
+
+    history = []
+    for message, response in reversed(kept):
+        history.append({"role": "user", "content": message})
+        history.append({"role": "assistant", "content": response})
+    return history
+
+
+def build_system_prompt(user_name, user_profile, workout_data, nutrition_data, user_message, today, memory_summary=""):
+    days = relevant_days(user_message, today)
+    memory = f"\n\nEarlier conversation (summary):\n{memory_summary}" if memory_summary else ""
+
+    return f"""You are Physiq, an AI fitness & nutrition assistant helping {user_name}.
+Use the user's latest saved data when answering. Be conversational and remember previous messages.
+Today is {today}.
+
+User Profile: age {user_profile.age}, height {user_profile.height}, weight {user_profile.weight}, goal {user_profile.fitness_goal}, activity {user_profile.activity_level}, diet {user_profile.dietary_preferences or "none"}
+
+Workout Plan:
+{compact_workout(workout_data, days) if workout_data else "None saved yet."}
+
+Nutrition Plan:
+{compact_nutrition(nutrition_data, days) if nutrition_data else "None saved yet."}{memory}"""
+
+
+def build_chat_messages(user_name, user_profile, workout_data, nutrition_data, pairs, user_message, today, memory_summary=""):
+    """Return (system_prompt, conversation_history) within the token budget."""
+    system_prompt = build_system_prompt(
+        user_name, user_profile, workout_data, nutrition_data, user_message, today, memory_summary
+    )
+    history = trim_history(pairs, settings.CHAT_HISTORY_TOKEN_BUDGET)
+    history.append({"role": "user", "content": user_message})
+    return system_prompt, history
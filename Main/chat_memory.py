@@ -0,0 +1,89 @@
+import threading
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from Main.models import ChatMemory, ChatMessage
+from prompts import CHAT_MEMORY_SYSTEM_MESSAGE, build_chat_memory_prompt
+from wrappers.azure_chat import allm
+
+# Cap per fold so a long backlog is caught up over a few turns
+MAX_FOLD_MESSAGES = 20
+
+
+def _unsummarized(user, memory):
+    messages = ChatMessage.objects.filter(user=user)
+    if memory and memory.summarized_until:
+        messages = messages.filter(timestamp__gt=memory.summarized_until)
+    return messages
+
+
+async def load_chat_memory(user):
+    """
+    Return (summary, pairs) for the next prompt: the rolling summary plus
+    the exchanges not folded into it yet, oldest first.
+    """
+    memory = await ChatMemory.objects.filter(user=user).afirst()
+    limit = settings.CHAT_HISTORY_MAX_MESSAGES + settings.CHAT_MEMORY_FOLD_BATCH
+    recent = [m async for m in _unsummarized(user, memory)[:limit]]
+    pairs = [(m.message, m.response) for m in reversed(recent)]
+    return (memory.summary if memory else ""), pairs
+
+
+async def fold_chat_memory(user):
+    """
+    Fold exchanges that fell out of the verbatim window into the summary.
+    Runs once CHAT_MEMORY_FOLD_BATCH of them have piled up, so the summary
+    call happens every few turns rather than on each one.
+    """
+    memory, _ = await ChatMemory.objects.aget_or_create(user=user)
+    pending = _unsummarized(user, memory)
+    count = await pending.acount()
+
+    window = settings.CHAT_HISTORY_MAX_MESSAGES
+    if count < window + settings.CHAT_MEMORY_FOLD_BATCH:
+        return
+
+    to_fold = [
+        m async for m in pending.order_by("timestamp")[: min(count - window, MAX_FOLD_MESSAGES)]
+    ]
+    summary = await allm(
+        build_chat_memory_prompt(memory.summary, [(m.message, m.response) for m in to_fold]),
+        system_message=CHAT_MEMORY_SYSTEM_MESSAGE,
+        endpoint="chat_memory",
+        user_id=user.id,
+    )
+    if not isinstance(summary, str) or not summary:
+        return
+
+    # Only apply if no other worker folded these messages in the meantime
+    await ChatMemory.objects.filter(
+        pk=memory.pk, summarized_until=memory.summarized_until
+    ).aupdate(
+        summary=summary,
+        summarized_until=to_fold[-1].timestamp,
+        updated_at=timezone.now(),
+    )
+
+
+def _fold_in_thread(user):
+    try:
+        # The ORM calls inside run on this thread, with its own connection
+        async_to_sync(fold_chat_memory)(user)
+    except Exception as e:
+        print(f"Chat memory error: {e}")
+    finally:
+        connection.close()
+
+
+def schedule_chat_memory_update(user):
+    """
+    Fold in the background so the reply isn't held up by the summary call.
+    A thread rather than an asyncio task: under WSGI the view's event loop
+    is torn down, pending tasks included, as soon as the response returns.
+    """
+    thread = threading.Thread(target=_fold_in_thread, args=(user,), daemon=True)
+    thread.start()
+    return thread
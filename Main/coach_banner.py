@@ -0,0 +1,119 @@
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from Main.plan_cache import get_latest_plans
+from prompts import generate_coach_summary
+
+COACH_BANNER_FALLBACK = "Focus on consistency today — progress compounds."
+COACH_BANNER_RETRY_SECONDS = 300
+
+
+def banner_cache_key(user_id, date):
+    return f"coach_summary:{user_id}:{date}"
+
+
+def find_day_block(week_plan, weekday_name):
+    """Find a day's block by day name. Falls back to first entry if not found."""
+    if not week_plan:
+        return None
+    for d in week_plan:
+        if str(d.get("day", "")).strip().lower() == weekday_name.strip().lower():
+            return d
+    return week_plan[0]
+
+
+def plan_day(user, weekday_name):
+    """
+    The latest workout/nutrition blocks and targets for one weekday, as
+    shown on the overview and fed to the coach banner.
+    """
+    plans = get_latest_plans(user, ["workout", "nutrition"])
+    latest_workout = plans["workout"]
+    latest_nutrition = plans["nutrition"]
+
+    workout_today = None
+    nutrition_today = None
+    daily_target = None
+    macro_targets = {"protein": None, "carbs": None, "fat": None}
+
+    if latest_workout and isinstance(latest_workout.plan_data, dict):
+        week_plan = latest_workout.plan_data.get("week_plan", [])
+        workout_today = find_day_block(week_plan, weekday_name)
+
+    if latest_nutrition and isinstance(latest_nutrition.plan_data, dict):
+        ndata = latest_nutrition.plan_data
+
+        week_plan = ndata.get("week_plan", [])
+        nutrition_today = find_day_block(week_plan, weekday_name)
+
+        daily_targets = ndata.get("daily_targets", {})
+        daily_target = daily_targets.get("calorie_target")
+
+        macro_targets = {
+            "protein": daily_targets.get("protein_g"),
+            "carbs": daily_targets.get("carbs_g"),
+            "fat": daily_targets.get("fat_g"),
+        }
+
+    return {
+        "workout_today": workout_today,
+        "nutrition_today": nutrition_today,
+        "daily_target": daily_target,
+        "macro_targets": macro_targets,
+    }
+
+
+def generate_banner(user, day):
+    """Ask the model for the banner; None if it failed."""
+    try:
+        summary = generate_coach_summary(
+            user.username,
+            day["workout_today"],
+            day["nutrition_today"],
+            {
+                "protein": day["macro_targets"].get("protein"),
+                "carbs": day["macro_targets"].get("carbs"),
+                "fat": day["macro_targets"].get("fat"),
+                "calories": day["daily_target"],
+            },
+            user_id=user.id,
+        )
+    except Exception:
+        return None
+
+    # llm() reports failures (including an open circuit) as a dict
+    if isinstance(summary, str) and summary:
+        return summary
+    return None
+
+
+def seconds_until_end_of(date, now=None):
+    """Seconds from now until local midnight at the end of date."""
+    now = now or timezone.localtime()
+    midnight = timezone.make_aware(datetime.combine(date + timedelta(days=1), time.min))
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def store_banner(user_id, date, banner, now=None):
+    cache.set(banner_cache_key(user_id, date), banner, timeout=seconds_until_end_of(date, now))
+
+
+def get_coach_banner(user, day, now_local):
+    """Today's banner from cache, generating it on a miss."""
+    today = now_local.date()
+    coach_banner = cache.get(banner_cache_key(user.id, today))
+    if coach_banner:
+        return coach_banner
+
+    coach_banner = generate_banner(user, day)
+    if coach_banner:
+        store_banner(user.id, today, coach_banner, now_local)
+    else:
+        # Serve the fallback now, but try the AI again in a few minutes
+        coach_banner = COACH_BANNER_FALLBACK
+        cache.set(
+            banner_cache_key(user.id, today), coach_banner, timeout=COACH_BANNER_RETRY_SECONDS
+        )
+    return coach_banner
@@ -0,0 +1,126 @@
+"""
+Model fields that store their value zlib-compressed in a BLOB column and
+are otherwise transparent to the ORM: reads give back the str / decoded
+JSON, writes (save, create, update) compress.
+
+Every stored value starts with a one-byte format tag, so the encoding can
+evolve without rewriting old rows:
+
+    \\x00  uncompressed UTF-8 (tiny values that zlib would only grow)
+    \\x01  zlib with PLAN_ZDICT_V1 as preset dictionary
+
+Rows written before a column switched to one of these fields are still
+plain text and are read as-is, so the table can be converted lazily; the
+migrations also rewrite them.
+"""
+
+import json
+import zlib
+
+from django.db import models
+
+RAW = b"\x00"
+ZLIB_PLAN_V1 = b"\x01"
+
+# Strings that recur in every plan, message and schedule. zlib can refer
+# back into a preset dictionary from the first byte, which is what makes
+# small values (a single day, a chat reply) compress well. Most frequent
+# last, as zlib reaches the end of the dictionary most cheaply.
+# Never edit a released dictionary: old rows need it byte for byte to
+# decompress. Add PLAN_ZDICT_V2 with a new format tag instead.
+PLAN_ZDICT_V1 = "".join([
+    # UserProfile.schedule
+    '{"monday":["6-8","8-10"],"tuesday":["10-12","12-14"],"wednesday":["14-16"],'
+    '"thursday":["16-18"],"friday":["18-20"],"saturday":["20-22"],"sunday":[]}',
+    # Chat
+    "I'd recommend you focus on your workout and nutrition plan today. ",
+    "Make sure to stay hydrated, get enough sleep and protein to recover. ",
+    "**Today's workout:** sets of reps with good form, progressive overload. ",
+    # Nutrition plans
+    '{"daily_targets":{"calorie_target":2500,"protein_g":180,"carbs_g":250,"fat_g":70},',
+    '"meals":[{"name":"Breakfast","items":[',
+    '{"name":"Lunch","items":[',
+    '{"name":"Dinner","items":[',
+    '{"name":"Snack","items":[',
+    '"portion":"1 cup","portion":"100g","portion":"200g","portion":"1 medium",',
+    "Chicken breast, Greek yogurt, Oats, Rice, Eggs, Salmon, Broccoli, Sweet potato, Banana, ",
+    '"meal_total_calories":',
+    '"day_total_calories":',
+    '{"food":"","portion":"","calories":0,"protein_g":0,"carbs_g":0,"fat_g":0,"notes":""}',
+    # Workout plans
+    '"encouragement_message":"',
+    '"recommended_time":"6:00 AM - 7:00 AM","recommended_time":"5:30 PM - 6:30 PM",',
+    '"focus":"Push","focus":"Pull","focus":"Legs","focus":"Upper","focus":"Lower",',
+    '"focus":"Full Body","focus":"Core","focus":"Cardio","focus":"Rest",',
+    '"session_type":"Rest","exercises":[],"notes":"Rest day. Light stretching and recovery."}',
+    '"session_type":"Cardio","exercises":[{"name":"","sets":null,"reps":null,"distance_m":5000,',
+    '"session_type":"Workout","exercises":[{"name":"","sets":3,"reps":12,"distance_m":null,"notes":""}',
+    '{"name":"","sets":4,"reps":10,"distance_m":null,"notes":"Focus on form."},',
+    '{"week_plan":[{"day":"Monday",',
+    '{"day":"Tuesday","day":"Wednesday","day":"Thursday","day":"Friday","day":"Saturday","day":"Sunday",',
+    '"notes":"","notes":null,"protein_g":"carbs_g":"fat_g":"calories":',
+    '","notes":"',
+    '},{"',
+]).encode()
+
+
+def compress(text):
+    data = text.encode()
+    compressor = zlib.compressobj(9, zdict=PLAN_ZDICT_V1)
+    compressed = compressor.compress(data) + compressor.flush()
+    if len(compressed) >= len(data):
+        return RAW + data
+    return ZLIB_PLAN_V1 + compressed
+
+
+def decompress(value):
+    """Stored value back to str; legacy uncompressed text passes through."""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    tag, body = value[:1], value[1:]
+    if tag == RAW:
+        return body.decode()
+    if tag == ZLIB_PLAN_V1:
+        decompressor = zlib.decompressobj(zdict=PLAN_ZDICT_V1)
+        return (decompressor.decompress(body) + decompressor.flush()).decode()
+    raise ValueError(f"Unknown compressed value format {tag!r}")
+
+
+class CompressedTextField(models.TextField):
+    """TextField stored compressed. Not usable in text lookups (contains, ...)."""
+
+    def get_internal_type(self):
+        return "BinaryField"
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None or hasattr(value, "as_sql"):
+            return value
+        return compress(value)
+
+    def from_db_value(self, value, expression, connection):
+        return decompress(value)
+
+
+class CompressedJSONField(models.JSONField):
+    """JSONField stored compressed. Key lookups (field__key=...) aren't supported."""
+
+    def get_internal_type(self):
+        return "BinaryField"
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        # JSONField.get_db_prep_save has already turned None into SQL NULL;
+        # a None that gets here is JSON null, as in JSONField
+        if not prepared:
+            value = self.get_prep_value(value)
+        if hasattr(value, "as_sql"):
+            return value
+        return compress(json.dumps(value, cls=self.encoder, separators=(",", ":")))
+
+    def from_db_value(self, value, expression, connection):
+        text = decompress(value)
+        if text is None:
+            return None
+        return json.loads(text, cls=self.decoder)
@@ -0,0 +1,151 @@
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Main.chat_context import build_chat_messages, estimate_tokens
+from Main.models import ChatMessage, Plan, UserProfile
+
+PLANS_PATH = Path(__file__).resolve().parents[2] / "bench_data" / "plans.json"
+
+QUESTIONS = [
+    "What's my workout today?",
+    "Can I swap Thursday's lunch for something vegetarian?",
+    "How does my weekly split look?",
+    "I'm sore from yesterday, should I still train?",
+]
+
+SAMPLE_REPLY = (
+    "Great question! Here's a quick breakdown:\n\n"
+    "- **Warm up** for 5-10 minutes with light cardio and dynamic stretches.\n"
+    "- Focus on controlled reps and full range of motion on your main lifts.\n"
+    "- Keep rest periods around 90 seconds for compound movements.\n"
+    "- Hit your protein target today to support recovery.\n\n"
+    "Stay consistent and you'll see progress week over week. "
+) * 3
+
+
+def legacy_messages(user_name, profile, workout, nutrition, pairs, user_message):
+    """The chat_api prompt before compaction: full indented plans, 10 raw pairs."""
+    history = []
+    for message, response in pairs[-10:]:
+        history.append({"role": "user", "content": message})
+        history.append({"role": "assistant", "content": response})
+    history.append({"role": "user", "content": user_message})
+
+    system_prompt = f"""
+    You are Physiq, an AI fitness & nutrition assistant helping {user_name}.
+    Use the user's latest saved data when answering. Be conversational and remember previous messages.
+
+    User Profile:
+    - Age: {profile.age}
+    - Height: {profile.height}
+    - Weight: {profile.weight}
+    - Goal: {profile.fitness_goal}
+    - Activity Level: {profile.activity_level}
+    - Dietary Preference: {profile.dietary_preferences}
+
+    Latest Workout Plan:
+    {json.dumps(workout, indent=2) if workout else "None saved yet."}
+
+    Latest Nutrition Plan:
+    {json.dumps(nutrition, indent=2) if nutrition else "None saved yet."}
+    """
+    return system_prompt, history
+
+
+def prompt_tokens(system_prompt, history):
+    return estimate_tokens(system_prompt) + sum(estimate_tokens(m["content"]) for m in history)
+
+
+class Command(BaseCommand):
+    help = "Compare chat_api prompt size and build time, legacy vs compact context."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Benchmark a real user's plans and chat history")
+        parser.add_argument("--rounds", type=int, default=200)
+        parser.add_argument(
+            "--call",
+            action="store_true",
+            help="Also send each prompt to the configured endpoint and time it",
+        )
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            profile = UserProfile.objects.select_related("user").get(user__username=options["user"])
+            user = profile.user
+            workout = Plan.current(user.id, "workout")
+            nutrition = Plan.current(user.id, "nutrition")
+            workout = workout.plan_data if workout else None
+            nutrition = nutrition.plan_data if nutrition else None
+            rows = list(ChatMessage.objects.filter(user=user)[:10])
+            pairs = [(m.message, m.response) for m in reversed(rows)]
+            user_name = user.username
+        else:
+            plans = json.loads(PLANS_PATH.read_text())
+            workout, nutrition = plans["workout"], plans["nutrition"]
+            profile = SimpleNamespace(
+                age=27, height="5'10", weight="175 lbs", fitness_goal="gain_muscle",
+                activity_level="moderate", dietary_preferences="",
+            )
+            pairs = [(q, SAMPLE_REPLY) for q in QUESTIONS * 3][:10]
+            user_name = "bench"
+
+        self.stdout.write(
+            f"History budget: {settings.CHAT_HISTORY_TOKEN_BUDGET} tokens, "
+            f"{len(pairs)} stored pairs\n"
+        )
+        self.stdout.write(f"{'question':<55} {'legacy':>8} {'compact':>8} {'saved':>6}")
+
+        totals = {"legacy": 0, "compact": 0}
+        for question in QUESTIONS:
+            legacy = legacy_messages(user_name, profile, workout, nutrition, pairs, question)
+            compact = build_chat_messages(
+                user_name, profile, workout, nutrition, pairs, question, "Thursday"
+            )
+            legacy_tokens = prompt_tokens(*legacy)
+            compact_tokens = prompt_tokens(*compact)
+            totals["legacy"] += legacy_tokens
+            totals["compact"] += compact_tokens
+            self.stdout.write(
+                f"{question[:55]:<55} {legacy_tokens:>8} {compact_tokens:>8} "
+                f"{1 - compact_tokens / legacy_tokens:>6.0%}"
+            )
+
+        self.stdout.write(
+            f"{'total (est. prompt tokens)':<55} {totals['legacy']:>8} {totals['compact']:>8} "
+            f"{1 - totals['compact'] / totals['legacy']:>6.0%}\n"
+        )
+
+        for name, build in (
+            ("legacy", lambda q: legacy_messages(user_name, profile, workout, nutrition, pairs, q)),
+            ("compact", lambda q: build_chat_messages(
+                user_name, profile, workout, nutrition, pairs, q, "Thursday"
+            )),
+        ):
+            started = time.perf_counter()
+            for _ in range(options["rounds"]):
+                for question in QUESTIONS:
+                    build(question)
+            per_build = (time.perf_counter() - started) / (options["rounds"] * len(QUESTIONS))
+            self.stdout.write(f"{name} build time: {per_build * 1000:.3f} ms")
+
+        if options["call"]:
+            from wrappers.azure_chat import llm
+
+            self.stdout.write("")
+            for name, build in (
+                ("legacy", lambda q: legacy_messages(user_name, profile, workout, nutrition, pairs, q)),
+                ("compact", lambda q: build_chat_messages(
+                    user_name, profile, workout, nutrition, pairs, q, "Thursday"
+                )),
+            ):
+                started = time.perf_counter()
+                for question in QUESTIONS:
+                    system_prompt, history = build(question)
+                    llm(history, system_message=system_prompt, cache=False, endpoint="bench")
+                elapsed = (time.perf_counter() - started) / len(QUESTIONS)
+                self.stdout.write(f"{name} end-to-end latency: {elapsed:.2f} s/turn")
@@ -0,0 +1,97 @@
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from Main import fields
+from Main.models import Plan
+from wrappers import fake_azure
+
+PLANS_PATH = Path(__file__).resolve().parents[2] / "bench_data" / "plans.json"
+
+ENCODINGS = {
+    "text": (
+        lambda text: text,
+        lambda value: value,
+    ),
+    "zlib": (
+        lambda text: zlib.compress(text.encode(), 9),
+        lambda value: zlib.decompress(value).decode(),
+    ),
+    "zlib+zdict": (fields.compress, fields.decompress),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare plain, zlib and zlib+preset-dictionary storage for plan JSON: "
+        "SQLite file size and read + decode latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000, help="Plans per test table")
+        parser.add_argument(
+            "--from-db",
+            action="store_true",
+            help="Sample plans from the Plan table instead of the bundled examples",
+        )
+
+    def _samples(self, from_db):
+        if from_db:
+            samples = [json.dumps(p) for p in Plan.objects.values_list("plan_data", flat=True)[:500]]
+            if samples:
+                return samples
+            self.stderr.write("No plans in the database; using the bundled examples")
+        bundled = json.loads(PLANS_PATH.read_text())
+        return [
+            json.dumps(bundled["workout"]),
+            json.dumps(bundled["nutrition"]),
+            json.dumps(fake_azure.workout_plan()),
+            json.dumps(fake_azure.nutrition_plan()),
+        ]
+
+    def _bench(self, directory, name, rows):
+        encode, decode = ENCODINGS[name]
+        path = os.path.join(directory, f"{name}.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE plan (id INTEGER PRIMARY KEY, plan_data BLOB)")
+        with conn:
+            conn.executemany("INSERT INTO plan (plan_data) VALUES (?)", ((encode(r),) for r in rows))
+        conn.execute("VACUUM")
+
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            for (value,) in conn.execute("SELECT plan_data FROM plan"):
+                json.loads(decode(value))
+            timings.append(time.perf_counter() - started)
+        conn.close()
+        return os.path.getsize(path), statistics.median(timings) / len(rows)
+
+    def handle(self, *args, **options):
+        samples = self._samples(options["from_db"])
+        rows = [samples[i % len(samples)] for i in range(options["rows"])]
+        self.stdout.write(
+            f"{len(rows)} plans from {len(samples)} sample(s), "
+            f"{sum(map(len, samples)) // len(samples)} bytes of JSON on average"
+        )
+
+        # One week_plan day on its own: small values are where the preset
+        # dictionary matters most
+        day = json.dumps(json.loads(samples[0])["week_plan"][0])
+        with tempfile.TemporaryDirectory() as directory:
+            self.stdout.write(f"{'encoding':<12}{'db size':>12}{'ratio':>8}{'read+decode':>14}{'one day':>10}")
+            baseline = None
+            for name, (encode, _) in ENCODINGS.items():
+                size, per_row = self._bench(directory, name, rows)
+                baseline = baseline or size
+                self.stdout.write(
+                    f"{name:<12}{size / 1024:>10.0f}KB{baseline / size:>7.1f}x"
+                    f"{per_row * 1e6:>12.1f}us{len(encode(day)):>9}B"
+                )
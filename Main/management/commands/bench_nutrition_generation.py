@@ -0,0 +1,75 @@
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from openai import AzureOpenAI
+
+from Main.plan_schema import validate_nutrition_plan
+from prompts import NUTRITION_SYSTEM_MESSAGE, build_nutrition_prompt, generate_nutrition_plan
+from wrappers import azure_chat, fake_azure
+from wrappers.azure_chat import llm
+
+BENCH_PROFILE = "bench (27, 5'10, 175 lbs, gain_muscle, moderate activity)"
+
+
+class Command(BaseCommand):
+    help = "Compare nutrition plan latency: single completion vs per-day fan-out."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=3)
+        parser.add_argument(
+            "--real",
+            action="store_true",
+            help="Use the configured Azure endpoint instead of a local fake one",
+        )
+        parser.add_argument("--first-token-latency", type=float, default=0.5)
+        parser.add_argument(
+            "--token-latency",
+            type=float,
+            default=0.004,
+            help="Simulated seconds per output token on the fake endpoint",
+        )
+
+    def _single(self):
+        return llm(
+            build_nutrition_prompt(BENCH_PROFILE, "", ""),
+            system_message=NUTRITION_SYSTEM_MESSAGE,
+            cache=False,
+            endpoint="bench",
+        )
+
+    def _fanout(self):
+        return generate_nutrition_plan(BENCH_PROFILE, cache=False)
+
+    def handle(self, *args, **options):
+        if not options["real"]:
+            server = fake_azure.start_server(
+                first_token_latency=options["first_token_latency"],
+                token_latency=options["token_latency"],
+            )
+            azure_chat.client = AzureOpenAI(
+                api_key="fake",
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION") or "2024-06-01",
+                azure_endpoint=f"http://127.0.0.1:{server.server_port}",
+                max_retries=0,
+            )
+            self.stdout.write(
+                f"Fake endpoint on port {server.server_port}: "
+                f"{options['first_token_latency']}s + {options['token_latency'] * 1000:.1f}ms/token"
+            )
+
+        for name, generate in (("single", self._single), ("fanout", self._fanout)):
+            timings = []
+            valid = 0
+            for _ in range(options["rounds"]):
+                started = time.perf_counter()
+                plan = generate()
+                timings.append(time.perf_counter() - started)
+                valid += not validate_nutrition_plan(plan)
+
+            self.stdout.write(
+                f"{name:<8} mean {statistics.mean(timings):6.2f}s  "
+                f"min {min(timings):6.2f}s  max {max(timings):6.2f}s  "
+                f"valid {valid}/{options['rounds']}"
+            )
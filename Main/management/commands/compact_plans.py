@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from Main.plan_archive import archivable_plan_ids, archive_plans
+
+
+class Command(BaseCommand):
+    help = (
+        "Move all but the newest plans of each type per user into the compressed "
+        "PlanArchive table. Works in small batches, each its own transaction, so "
+        "the database is never write-locked for long; safe to stop and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep",
+            type=int,
+            default=settings.PLAN_HISTORY_KEEP,
+            help="Newest plans of each type to keep per user (default: PLAN_HISTORY_KEEP)",
+        )
+        parser.add_argument("--batch-size", type=int, default=100, help="Plans archived per transaction")
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Seconds to sleep between batches, letting web requests take the write lock",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived")
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help="VACUUM afterwards to give the freed space back to the filesystem (locks the database)",
+        )
+
+    def handle(self, *args, **options):
+        if options["keep"] < 1:
+            raise CommandError("--keep must be at least 1")
+
+        plan_ids = archivable_plan_ids(options["keep"])
+        self.stdout.write(f"{len(plan_ids)} plan(s) to archive, keeping the newest {options['keep']}")
+        if options["dry_run"] or not plan_ids:
+            return
+
+        started = time.monotonic()
+        archived = 0
+        size = max(1, options["batch_size"])
+        for i in range(0, len(plan_ids), size):
+            archived += archive_plans(plan_ids[i:i + size])
+            self.stdout.write(f"  {archived}/{len(plan_ids)}")
+            time.sleep(options["pause"])
+
+        self.stdout.write(f"Archived {archived} plan(s) in {time.monotonic() - started:.1f}s")
+
+        if options["vacuum"]:
+            if connection.vendor == "sqlite":
+                with connection.cursor() as cursor:
+                    cursor.execute("VACUUM")
+                self.stdout.write("Vacuumed")
+            else:
+                self.stdout.write("--vacuum only applies to SQLite; skipped")
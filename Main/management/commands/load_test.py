@@ -0,0 +1,201 @@
+import random
+import secrets
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from Main.models import Plan, UserProfile
+from wrappers import fake_azure
+
+USERNAME_PREFIX = "loadtest_"
+
+SCENARIO = [
+    ("overview", "GET", "/dashboard/overview/"),
+    ("chat", "POST", "/api/chat/"),
+    ("workout", "GET", "/dashboard/workout/"),
+    ("nutrition", "GET", "/dashboard/nutrition/"),
+]
+
+CHAT_MESSAGES = [
+    "What's my workout today?",
+    "How much protein should I eat after training?",
+    "Can I swap today's lunch for something quicker?",
+    "I'm sore from yesterday, should I still train?",
+]
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a sorted list."""
+    if not samples:
+        return None
+    rank = max(1, round(q * len(samples)))
+    return samples[min(rank, len(samples)) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a running server with concurrent synthetic users and report "
+        "p50/p95/p99 latency and throughput per endpoint. Point the server at "
+        "`python -m wrappers.fake_azure` to avoid spending quota."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--users", type=int, default=20, help="Concurrent synthetic users")
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+        parser.add_argument("--think-time", type=float, default=0.0, help="Max random pause between requests")
+        parser.add_argument(
+            "--endpoints",
+            default=",".join(name for name, _, _ in SCENARIO),
+            help="Comma-separated subset of: " + ", ".join(name for name, _, _ in SCENARIO),
+        )
+        parser.add_argument(
+            "--seed-plans",
+            action="store_true",
+            help="Give synthetic users ready plans, so plan tabs render instead of queueing jobs",
+        )
+        parser.add_argument(
+            "--keep-users",
+            action="store_true",
+            help="Don't delete the synthetic users afterwards",
+        )
+
+    def _create_users(self, count, seed_plans, password):
+        users = []
+        for i in range(count):
+            user, _ = User.objects.get_or_create(username=f"{USERNAME_PREFIX}{i}")
+            user.set_password(password)
+            user.save()
+            UserProfile.objects.update_or_create(
+                user=user,
+                defaults={
+                    "age": 30, "height": "5'10", "weight": "175 lbs",
+                    "fitness_goal": "gain_muscle", "profile_completed": True,
+                },
+            )
+            if seed_plans:
+                for plan_type, plan_data in (
+                    ("workout", fake_azure.workout_plan()),
+                    ("nutrition", fake_azure.nutrition_plan()),
+                ):
+                    if not Plan.objects.filter(user=user, plan_type=plan_type).exists():
+                        Plan.create_current(user, plan_type, plan_data)
+            users.append(user)
+        return users
+
+    def _login(self, base_url, username, password):
+        session = requests.Session()
+        try:
+            session.get(f"{base_url}/login/", timeout=30)
+        except requests.RequestException as e:
+            raise CommandError(f"Could not reach {base_url}: {e}")
+        response = session.post(
+            f"{base_url}/login/",
+            data={
+                "username": username,
+                "password": password,
+                "csrfmiddlewaretoken": session.cookies.get("csrftoken", ""),
+            },
+            headers={"Referer": f"{base_url}/login/"},
+            allow_redirects=False,
+            timeout=30,
+        )
+        if response.status_code != 302:
+            raise CommandError(f"Login failed for {username}: HTTP {response.status_code}")
+        return session
+
+    def _run_user(self, base_url, username, password, steps, deadline, think_time, results, lock):
+        session = self._login(base_url, username, password)
+        rng = random.Random(username)
+        i = rng.randrange(len(steps))
+
+        while time.monotonic() < deadline:
+            name, method, path = steps[i % len(steps)]
+            i += 1
+
+            started = time.perf_counter()
+            try:
+                if method == "POST":
+                    response = session.post(
+                        f"{base_url}{path}",
+                        data={"message": rng.choice(CHAT_MESSAGES)},
+                        headers={"X-CSRFToken": session.cookies.get("csrftoken", "")},
+                        timeout=120,
+                    )
+                else:
+                    response = session.get(f"{base_url}{path}", timeout=120)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+
+            with lock:
+                results[name].append((elapsed, ok))
+
+            if think_time:
+                time.sleep(rng.uniform(0, think_time))
+
+    def handle(self, *args, **options):
+        # The synthetic users are real accounts in whatever database this
+        # settings module points at
+        if not settings.DEBUG and "test" not in (settings.SETTINGS_MODULE or ""):
+            raise CommandError("Refusing to create load test users: run with DEBUG or test settings")
+
+        base_url = options["base_url"].rstrip("/")
+        wanted = [e.strip() for e in options["endpoints"].split(",") if e.strip()]
+        steps = [s for s in SCENARIO if s[0] in wanted]
+        if not steps:
+            raise CommandError("No known endpoints selected")
+
+        password = secrets.token_urlsafe(16)
+        results = defaultdict(list)
+        lock = threading.Lock()
+        try:
+            users = self._create_users(options["users"], options["seed_plans"], password)
+            self.stdout.write(
+                f"{len(users)} users hitting {base_url} for {options['duration']:g}s: "
+                f"{', '.join(name for name, _, _ in steps)}"
+            )
+
+            started = time.monotonic()
+            deadline = started + options["duration"]
+            with ThreadPoolExecutor(max_workers=len(users)) as pool:
+                futures = [
+                    pool.submit(
+                        self._run_user, base_url, user.username, password, steps, deadline,
+                        options["think_time"], results, lock,
+                    )
+                    for user in users
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            if not options["keep_users"]:
+                User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        wall = time.monotonic() - started
+
+        self.stdout.write(
+            f"\n{'endpoint':<12} {'requests':>8} {'errors':>7} {'req/s':>7} "
+            f"{'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}"
+        )
+        total = 0
+        for name, _, _ in steps:
+            samples = results.get(name, [])
+            latencies = sorted(t for t, _ in samples)
+            errors = sum(1 for _, ok in samples if not ok)
+            total += len(samples)
+            if not latencies:
+                self.stdout.write(f"{name:<12} {0:>8}")
+                continue
+            self.stdout.write(
+                f"{name:<12} {len(samples):>8} {errors:>7} {len(samples) / wall:>7.1f} "
+                f"{percentile(latencies, 0.5):>7.3f} {percentile(latencies, 0.95):>7.3f} "
+                f"{percentile(latencies, 0.99):>7.3f} {latencies[-1]:>7.3f}"
+            )
+        self.stdout.write(f"\nTotal: {total} requests in {wall:.1f}s ({total / wall:.1f} req/s)")
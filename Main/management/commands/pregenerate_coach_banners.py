@@ -0,0 +1,95 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date as date_cls, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from Main.coach_banner import (
+    COACH_BANNER_FALLBACK,
+    banner_cache_key,
+    generate_banner,
+    plan_day,
+    store_banner,
+)
+from Main.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute each active user's coach banner for a day (tomorrow by default) "
+        "so the first overview load of the day is a cache hit. Run nightly, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Day to generate for, YYYY-MM-DD (default: tomorrow)")
+        parser.add_argument("--concurrency", type=int, default=4, help="Parallel LLM calls")
+        parser.add_argument(
+            "--active-days",
+            type=int,
+            default=14,
+            help="Only users who logged in within this many days",
+        )
+        parser.add_argument("--force", action="store_true", help="Regenerate banners already cached")
+
+    def _generate(self, user, day_date, force):
+        try:
+            key = banner_cache_key(user.id, day_date)
+            cached = cache.get(key)
+            if cached and cached != COACH_BANNER_FALLBACK and not force:
+                return "cached"
+
+            banner = generate_banner(user, plan_day(user, day_date.strftime("%A")))
+            if not banner:
+                return "failed"
+            store_banner(user.id, day_date, banner)
+            return "generated"
+        finally:
+            # Each worker thread holds its own DB connection
+            connection.close()
+
+    def handle(self, *args, **options):
+        backend = settings.CACHES["default"]["BACKEND"]
+        if backend.endswith("LocMemCache"):
+            self.stderr.write(
+                "Warning: the default cache is LocMemCache, which is private to this "
+                "process; the web workers won't see these banners."
+            )
+
+        if options["date"]:
+            day_date = date_cls.fromisoformat(options["date"])
+        else:
+            day_date = timezone.localdate() + timedelta(days=1)
+
+        since = timezone.now() - timedelta(days=options["active_days"])
+        users = [
+            p.user
+            for p in UserProfile.objects.select_related("user").filter(
+                profile_completed=True, user__is_active=True, user__last_login__gte=since
+            )
+        ]
+        self.stdout.write(f"Generating banners for {len(users)} user(s) on {day_date}")
+
+        started = time.monotonic()
+        results = {"generated": 0, "cached": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=max(1, options["concurrency"])) as pool:
+            futures = {
+                pool.submit(self._generate, user, day_date, options["force"]): user
+                for user in users
+            }
+            for future in as_completed(futures):
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    user = futures[future]
+                    self.stderr.write(f"Banner for {user.username} failed: {e}")
+                    outcome = "failed"
+                results[outcome] += 1
+
+        self.stdout.write(
+            f"Done in {time.monotonic() - started:.1f}s: {results['generated']} generated, "
+            f"{results['cached']} already cached, {results['failed']} failed"
+        )
@@ -0,0 +1,62 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Main.plan_jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued workout/nutrition plan generation jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue, then exit")
+        parser.add_argument("--poll", type=float, default=1.0, help="Seconds between polls when idle")
+        parser.add_argument("--threads", type=int, default=2, help="Jobs processed in parallel")
+        parser.add_argument(
+            "--visibility-timeout",
+            type=int,
+            default=settings.PLAN_JOBS_VISIBILITY_TIMEOUT,
+            help="Seconds before a running job is handed to another worker",
+        )
+
+    def _work(self, stop, visibility_timeout, once, poll):
+        while not stop.is_set():
+            close_old_connections()
+            job = claim_next_job(visibility_timeout)
+            if job is None:
+                if once:
+                    return
+                stop.wait(poll)
+                continue
+
+            started = time.monotonic()
+            job = run_job(job)
+            self.stdout.write(
+                f"[PlanJob {job.pk}] {job.plan_type} for user {job.user_id}: "
+                f"{job.status} in {time.monotonic() - started:.1f}s"
+            )
+
+    def handle(self, *args, **options):
+        threads = max(1, options["threads"])
+        self.stdout.write(f"Plan worker started with {threads} thread(s)")
+
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            futures = [
+                pool.submit(
+                    self._work, stop, options["visibility_timeout"], options["once"], options["poll"]
+                )
+                for _ in range(threads)
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except KeyboardInterrupt:
+                # Let in-flight jobs finish; unfinished ones are retried
+                # after their visibility timeout anyway
+                stop.set()
+                self.stdout.write("Plan worker stopping...")
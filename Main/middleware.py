@@ -1,3 +1,4 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.shortcuts import redirect
 from django.urls import resolve
 
@@ -5,10 +6,28 @@ from Main.models import UserProfile
 
 
 class ForceProfileCompletionMiddleware:
+    # Supports both modes so async views (chat_api) keep a fully async
+    # request stack under ASGI instead of being pinned to a thread.
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _incomplete_profile_redirect(self, request, profile):
+        current_url = resolve(request.path_info).url_name
+
+        # Allow profile page & logout while incomplete
+        if not profile.profile_completed:
+            if current_url not in ("profile", "logout"):
+                return redirect("profile")
+        return None
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
 
         if request.user.is_authenticated:
             profile, created = UserProfile.objects.get_or_create(
@@ -16,11 +35,23 @@ class ForceProfileCompletionMiddleware:
                 defaults={"profile_completed": False}
             )
 
-            current_url = resolve(request.path_info).url_name
+            response = self._incomplete_profile_redirect(request, profile)
+            if response:
+                return response
+
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser()
+
+        if user.is_authenticated:
+            profile, created = await UserProfile.objects.aget_or_create(
+                user=user,
+                defaults={"profile_completed": False}
+            )
 
-            # Allow profile page & logout while incomplete
-            if not profile.profile_completed:
-                if current_url not in ("profile", "logout"):
-                    return redirect("profile")
+            response = self._incomplete_profile_redirect(request, profile)
+            if response:
+                return response
 
-        return self.get_response(request)
\ No newline at end of file
+        return await self.get_response(request)
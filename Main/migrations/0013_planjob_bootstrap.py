@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0012_planjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='planjob',
+            name='plan_type',
+            field=models.CharField(choices=[('workout', 'Workout Plan'), ('nutrition', 'Nutrition Plan'), ('bootstrap', 'Workout + Nutrition')], max_length=20),
+        ),
+    ]
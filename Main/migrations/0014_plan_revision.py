@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0013_planjob_bootstrap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='PlanRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.PositiveIntegerField()),
+                ('day', models.CharField(max_length=10)),
+                ('previous_data', models.JSONField()),
+                ('notes', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='Main.plan')),
+            ],
+            options={
+                'ordering': ['-revision'],
+                'constraints': [models.UniqueConstraint(fields=('plan', 'revision'), name='unique_plan_revision')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0014_plan_revision'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['user', '-timestamp'], name='chat_user_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photolocker',
+            index=models.Index(condition=models.Q(('visibility', 'public')), fields=['-uploaded_at'], name='photo_public_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photolocker',
+            index=models.Index(fields=['user', '-uploaded_at'], name='photo_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['user', 'plan_type', '-created_at'], name='plan_user_type_latest_idx'),
+        ),
+    ]
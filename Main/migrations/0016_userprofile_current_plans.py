@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def point_at_latest_plans(apps, schema_editor):
+    UserProfile = apps.get_model("Main", "UserProfile")
+    Plan = apps.get_model("Main", "Plan")
+
+    def latest(plan_type):
+        return Subquery(
+            Plan.objects.filter(user=OuterRef("user"), plan_type=plan_type)
+            .order_by("-created_at")
+            .values("pk")[:1]
+        )
+
+    UserProfile.objects.update(
+        current_workout_plan=latest("workout"),
+        current_nutrition_plan=latest("nutrition"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0015_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='current_nutrition_plan',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Main.plan'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='current_workout_plan',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Main.plan'),
+        ),
+        migrations.RunPython(point_at_latest_plans, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:10
+
+import json
+
+import Main.fields
+from django.db import migrations
+
+COMPRESSED_COLUMNS = [
+    ("ChatMessage", "message"),
+    ("ChatMessage", "response"),
+    ("Plan", "plan_data"),
+    ("UserProfile", "schedule"),
+]
+
+
+def compress_existing_rows(apps, schema_editor):
+    # AlterField only changed the column type; existing rows are still
+    # plain text (the fields read that fine). Saving them again compresses.
+    for model_name, field_name in COMPRESSED_COLUMNS:
+        model = apps.get_model("Main", model_name)
+        rows = model.objects.values_list("pk", field_name).order_by("pk")
+        for pk, value in rows.iterator(chunk_size=500):
+            model.objects.filter(pk=pk).update(**{field_name: value})
+
+
+def decompress_rows(apps, schema_editor):
+    # Back to plain text with raw SQL, before the columns revert to
+    # TextField/JSONField (whose JSON_VALID check would reject the blobs)
+    quote = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for model_name, field_name in COMPRESSED_COLUMNS:
+            model = apps.get_model("Main", model_name)
+            field = model._meta.get_field(field_name)
+            sql = (
+                f"UPDATE {quote(model._meta.db_table)} SET {quote(field.column)} = %s "
+                f"WHERE {quote(model._meta.pk.column)} = %s"
+            )
+            rows = model.objects.values_list("pk", field_name).order_by("pk")
+            for pk, value in rows.iterator(chunk_size=500):
+                if value is not None and isinstance(field, Main.fields.CompressedJSONField):
+                    value = json.dumps(value)
+                cursor.execute(sql, [value, pk])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0017_planarchive'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='message',
+            field=Main.fields.CompressedTextField(),
+        ),
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='response',
+            field=Main.fields.CompressedTextField(),
+        ),
+        migrations.AlterField(
+            model_name='plan',
+            name='plan_data',
+            field=Main.fields.CompressedJSONField(),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='schedule',
+            field=Main.fields.CompressedJSONField(blank=True, default=dict, null=True),
+        ),
+        migrations.RunPython(compress_existing_rows, decompress_rows),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Main', '0018_compressed_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='planjob',
+            name='unique_active_plan_job',
+        ),
+        migrations.AddConstraint(
+            model_name='planjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'queued')), fields=('user', 'plan_type'), name='unique_queued_plan_job'),
+        ),
+        migrations.AddConstraint(
+            model_name='planjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'running')), fields=('user', 'plan_type'), name='unique_running_plan_job'),
+        ),
+    ]
@@ -1,9 +1,11 @@
-from django.db import models
-from django.contrib.auth.models import User
-
+from decimal import Decimal
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from Main.fields import CompressedJSONField, CompressedTextField
 
 
 class UserProfile(models.Model):
@@ -31,8 +33,21 @@ class UserProfile(models.Model):
     dietary_preferences = models.CharField(max_length=200, blank=True)
     allergies = models.CharField(max_length=200, blank=True)
     budget = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
-    schedule = models.JSONField(default=dict, blank=True, null=True)
+    schedule = CompressedJSONField(default=dict, blank=True, null=True)
     profile_completed = models.BooleanField(default=False)
+    # Newest plan of each type, set by Plan.create_current, so the active
+    # plan is one primary-key lookup however long the plan history gets
+    current_workout_plan = models.ForeignKey(
+        "Plan", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    current_nutrition_plan = models.ForeignKey(
+        "Plan", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
+    CURRENT_PLAN_FIELDS = {
+        "workout": "current_workout_plan",
+        "nutrition": "current_nutrition_plan",
+    }
 
     def is_complete(self):
         required = [self.age, self.height, self.weight, self.fitness_goal]
@@ -50,25 +65,175 @@ class Plan(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="plans")
     plan_type = models.CharField(max_length=20, choices=PLAN_TYPES)
-    plan_data = models.JSONField()
+    plan_data = CompressedJSONField()
+    # Bumped on each in-place day edit (see PlanRevision)
+    revision = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The user's latest plan of a type
+            models.Index(fields=["user", "plan_type", "-created_at"], name="plan_user_type_latest_idx"),
+        ]
+
+    @classmethod
+    def create_current(cls, user, plan_type, plan_data):
+        """Save a new plan and point the user's profile at it, atomically."""
+        with transaction.atomic():
+            plan = cls.objects.create(user=user, plan_type=plan_type, plan_data=plan_data)
+            UserProfile.objects.filter(user=user).update(
+                **{UserProfile.CURRENT_PLAN_FIELDS[plan_type]: plan}
+            )
+        return plan
+
+    @classmethod
+    def current(cls, user_id, plan_type):
+        """
+        The user's active plan, by the pointer on their profile. Falls back
+        to the newest row (and re-points the profile) if the pointer is
+        unset, e.g. after the current plan was deleted.
+        """
+        field = UserProfile.CURRENT_PLAN_FIELDS[plan_type]
+        profile = UserProfile.objects.select_related(field).filter(user_id=user_id).first()
+        plan = getattr(profile, field) if profile else None
+        if plan is None:
+            plan = (
+                cls.objects.filter(user_id=user_id, plan_type=plan_type)
+                .order_by("-created_at")
+                .first()
+            )
+            if plan and profile:
+                UserProfile.objects.filter(pk=profile.pk, **{field: None}).update(**{field: plan})
+        return plan
+
+
+class PlanRevision(models.Model):
+    """
+    One regenerated day of a plan. The plan row is patched in place; this
+    keeps the replaced day so an edit can be inspected or undone.
+    """
+
+    plan = models.ForeignKey(Plan, on_delete=models.CASCADE, related_name="revisions")
+    revision = models.PositiveIntegerField()
+    day = models.CharField(max_length=10)
+    previous_data = models.JSONField()
+    notes = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-revision"]
+        constraints = [
+            models.UniqueConstraint(fields=["plan", "revision"], name="unique_plan_revision")
+        ]
+
+    def __str__(self):
+        return f"{self.plan.plan_type} plan {self.plan_id} r{self.revision} - {self.day}"
+
+
+class PlanArchive(models.Model):
+    """
+    A plan moved out of the hot Plan table by `manage.py compact_plans`.
+    plan_data and its day revisions are kept as one zlib-compressed JSON
+    document (see Main.plan_archive).
+    """
+
+    plan_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_plans")
+    plan_type = models.CharField(max_length=20, choices=Plan.PLAN_TYPES)
+    revision = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "plan_type", "-created_at"], name="archive_user_type_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.plan_type} plan {self.plan_id} (archived)"
+
+
+class PlanJob(models.Model):
+    """
+    Queued plan generation, processed by `manage.py run_plan_worker`.
+    At most one queued and one running job exist per (user, plan_type),
+    and a user's jobs are claimed one at a time (see plan_jobs.claim_job).
+    """
+
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    ACTIVE_STATUSES = ("queued", "running")
+    # A new user's first workout and nutrition plans, generated together
+    JOB_TYPES = Plan.PLAN_TYPES + [("bootstrap", "Workout + Nutrition")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="plan_jobs")
+    plan_type = models.CharField(max_length=20, choices=JOB_TYPES)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    plan = models.ForeignKey(Plan, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "plan_type"],
+                condition=models.Q(status="queued"),
+                name="unique_queued_plan_job",
+            ),
+            models.UniqueConstraint(
+                fields=["user", "plan_type"],
+                condition=models.Q(status="running"),
+                name="unique_running_plan_job",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.plan_type} - {self.status}"
 
 
 class ChatMessage(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="chat_messages"
     )
-    message = models.TextField()
-    response = models.TextField()
+    message = CompressedTextField()
+    response = CompressedTextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-timestamp"]
+        indexes = [
+            models.Index(fields=["user", "-timestamp"], name="chat_user_latest_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
 
+class ChatMemory(models.Model):
+    """Rolling summary of chat messages that have left the verbatim window."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="chat_memory")
+    summary = models.TextField(blank=True, default="")
+    summarized_until = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - memory"
+
+
 class DailyProgress(models.Model):
     WORKOUT_STATUS_CHOICES = [
         ("done", "Done"),
@@ -124,6 +289,15 @@ class PhotoLocker(models.Model):
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Community feed and today's public post count
+            models.Index(
+                fields=["-uploaded_at"],
+                condition=models.Q(visibility="public"),
+                name="photo_public_recent_idx",
+            ),
+            models.Index(fields=["user", "-uploaded_at"], name="photo_user_recent_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.visibility.capitalize()}"
@@ -131,4 +305,41 @@ class PhotoLocker(models.Model):
     @staticmethod
     def public_photos():
         """Return all public photos for the community feed."""
-        return PhotoLocker.objects.filter(visibility="public").select_related("user").order_by("-uploaded_at")
\ No newline at end of file
+        return PhotoLocker.objects.filter(visibility="public").select_related("user").order_by("-uploaded_at")
+
+
+class TokenUsage(models.Model):
+    """Per-user daily LLM token ledger, one row per calling endpoint."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="token_usage")
+    date = models.DateField()
+    endpoint = models.CharField(max_length=50)
+    calls = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    cost = models.DecimalField(max_digits=10, decimal_places=6, default=0)
+
+    class Meta:
+        ordering = ["-date"]
+        unique_together = ["user", "date", "endpoint"]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} - {self.endpoint}"
+
+    @staticmethod
+    def record_call(record):
+        """llm_metrics sink: add one call to the caller's ledger row for today."""
+        if not record["user_id"] or record["cached"]:
+            return
+
+        usage, _ = TokenUsage.objects.get_or_create(
+            user_id=record["user_id"],
+            date=timezone.localdate(),
+            endpoint=record["endpoint"],
+        )
+        TokenUsage.objects.filter(pk=usage.pk).update(
+            calls=F("calls") + 1,
+            prompt_tokens=F("prompt_tokens") + record["prompt_tokens"],
+            completion_tokens=F("completion_tokens") + record["completion_tokens"],
+            cost=F("cost") + Decimal(str(round(record["cost"], 6))),
+        )
@@ -0,0 +1,98 @@
+"""
+The overview tab's per-user "today" model: today's plan blocks, targets
+and meals JSON, built once per (plan versions, date) and cached until
+midnight. The request path is then one cache.get_many for the model, the
+plan versions, the public post count and the coach banner.
+"""
+
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from Main.coach_banner import banner_cache_key, get_coach_banner, plan_day, seconds_until_end_of
+from Main.models import PhotoLocker
+from Main.plan_cache import get_plan_versions, plan_versions_key
+
+
+def overview_key(user_id, date):
+    return f"overview:{user_id}:{date}"
+
+
+def public_posts_key(date):
+    return f"public_posts:{date}"
+
+
+def build_overview(user, date, versions):
+    day = plan_day(user, date.strftime("%A"))
+
+    meals_json = "[]"
+    if day["nutrition_today"]:
+        try:
+            meals_json = json.dumps(day["nutrition_today"].get("meals", []))
+        except Exception:
+            meals_json = "[]"
+
+    return {**day, "meals_json": meals_json, "versions": versions}
+
+
+def public_posts_on(date):
+    # A range on uploaded_at rather than uploaded_at__date, which wraps the
+    # column in a date conversion and can't use photo_public_recent_idx
+    start = timezone.make_aware(datetime.combine(date, time.min))
+    end = timezone.make_aware(datetime.combine(date + timedelta(days=1), time.min))
+    return PhotoLocker.objects.filter(
+        visibility="public", uploaded_at__gte=start, uploaded_at__lt=end
+    )
+
+
+def count_public_posts(date):
+    return public_posts_on(date).count()
+
+
+def get_overview(user, now_local):
+    """
+    (overview, coach_banner, new_posts_today) for the overview tab. The
+    model is rebuilt only when the date or a plan version changed.
+    """
+    today = now_local.date()
+    until_midnight = seconds_until_end_of(today, now_local)
+    keys = {
+        "overview": overview_key(user.id, today),
+        "versions": plan_versions_key(user.id),
+        "posts": public_posts_key(today),
+        "banner": banner_cache_key(user.id, today),
+    }
+    found = cache.get_many(keys.values())
+
+    versions = found.get(keys["versions"]) or get_plan_versions(user)
+    overview = found.get(keys["overview"])
+    if overview is None or overview["versions"] != versions:
+        overview = build_overview(user, today, versions)
+        cache.set(keys["overview"], overview, until_midnight)
+
+    new_posts_today = found.get(keys["posts"])
+    if new_posts_today is None:
+        new_posts_today = count_public_posts(today)
+        cache.set(keys["posts"], new_posts_today, until_midnight)
+
+    coach_banner = found.get(keys["banner"]) or get_coach_banner(user, overview, now_local)
+    return overview, coach_banner, new_posts_today
+
+
+def invalidate_public_posts(photo):
+    date = timezone.localdate(photo.uploaded_at) if photo.uploaded_at else timezone.localdate()
+    transaction.on_commit(lambda: cache.delete(public_posts_key(date)))
+
+
+def overview_version(user, today):
+    """
+    What the overview tab shows depends on, read without building it: plan
+    versions, the public post count and the banner. Used for its ETag.
+    """
+    posts_key = public_posts_key(today)
+    banner_key = banner_cache_key(user.id, today)
+    found = cache.get_many([posts_key, banner_key])
+    return (get_plan_versions(user), found.get(posts_key), found.get(banner_key))
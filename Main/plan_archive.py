@@ -0,0 +1,90 @@
+import json
+import zlib
+
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from Main.models import Plan, PlanArchive, PlanRevision, UserProfile
+
+
+def compress_plan(plan, revisions):
+    document = {
+        "plan_data": plan.plan_data,
+        "revisions": [
+            {
+                "revision": r.revision,
+                "day": r.day,
+                "previous_data": r.previous_data,
+                "notes": r.notes,
+                "created_at": r.created_at.isoformat(),
+            }
+            for r in revisions
+        ],
+    }
+    return zlib.compress(json.dumps(document, separators=(",", ":")).encode(), 9)
+
+
+def load_archived_plan(archive):
+    """{"plan_data": ..., "revisions": [...]} for an archived plan."""
+    return json.loads(zlib.decompress(bytes(archive.data)))
+
+
+def _current_plan_ids():
+    ids = set()
+    for field in UserProfile.CURRENT_PLAN_FIELDS.values():
+        ids.update(
+            UserProfile.objects.filter(**{f"{field}__isnull": False}).values_list(f"{field}_id", flat=True)
+        )
+    return ids
+
+
+def archivable_plan_ids(keep):
+    """
+    Ids of plans older than the keep newest of their (user, plan_type),
+    oldest first. Reads ids only, walking plan_user_type_latest_idx.
+    """
+    ranked = Plan.objects.annotate(
+        rank=Window(
+            RowNumber(),
+            partition_by=[F("user_id"), F("plan_type")],
+            order_by=F("created_at").desc(),
+        )
+    ).filter(rank__gt=keep)
+    current = _current_plan_ids()
+    return [pk for pk in ranked.order_by("pk").values_list("pk", flat=True) if pk not in current]
+
+
+def archive_plans(plan_ids):
+    """
+    Move a batch of plans into PlanArchive in one short transaction.
+    Current plans are re-checked inside it and never archived. Returns
+    the number of plans archived.
+    """
+    with transaction.atomic():
+        current = _current_plan_ids()
+        plans = [
+            plan for plan in Plan.objects.filter(pk__in=plan_ids) if plan.pk not in current
+        ]
+        if not plans:
+            return 0
+
+        revisions = {}
+        for r in PlanRevision.objects.filter(plan__in=plans).order_by("revision"):
+            revisions.setdefault(r.plan_id, []).append(r)
+
+        PlanArchive.objects.bulk_create(
+            [
+                PlanArchive(
+                    plan_id=plan.pk,
+                    user_id=plan.user_id,
+                    plan_type=plan.plan_type,
+                    revision=plan.revision,
+                    created_at=plan.created_at,
+                    data=compress_plan(plan, revisions.get(plan.pk, [])),
+                )
+                for plan in plans
+            ]
+        )
+        Plan.objects.filter(pk__in=[plan.pk for plan in plans]).delete()
+    return len(plans)
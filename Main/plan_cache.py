@@ -0,0 +1,84 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+
+from Main.models import Plan, UserProfile
+
+# Invalidation is explicit (see Main.signals); the timeout only bounds how
+# long a fill that raced an invalidation can serve the older plan
+LATEST_PLAN_TIMEOUT = 60 * 60
+
+# Cached for users with no plan yet, so they don't query on every request
+NO_PLAN = "none"
+
+
+def latest_plan_key(user_id, plan_type):
+    return f"latest_plan:{user_id}:{plan_type}"
+
+
+def get_latest_plans(user, plan_types):
+    """
+    {plan_type: newest Plan or None}, with plan_data already decoded. Hits
+    are read in one cache round trip; misses are fetched and cached.
+    """
+    keys = {latest_plan_key(user.id, t): t for t in plan_types}
+    found = cache.get_many(keys)
+
+    plans = {}
+    for key, plan_type in keys.items():
+        plan = found.get(key)
+        if plan is None:
+            plan = Plan.current(user.id, plan_type)
+            cache.set(key, plan or NO_PLAN, LATEST_PLAN_TIMEOUT)
+        plans[plan_type] = plan if isinstance(plan, Plan) else None
+    return plans
+
+
+def get_latest_plan(user, plan_type):
+    return get_latest_plans(user, [plan_type])[plan_type]
+
+
+async def aget_latest_plan(user, plan_type):
+    return await sync_to_async(get_latest_plan)(user, plan_type)
+
+
+def invalidate_latest_plan(user_id, plan_type):
+    # After commit, so a reader can't re-cache the old row in between
+    transaction.on_commit(lambda: cache.delete_many([
+        latest_plan_key(user_id, plan_type),
+        plan_versions_key(user_id),
+    ]))
+
+
+def plan_versions_key(user_id):
+    return f"plan_versions:{user_id}"
+
+
+def _fetch_plan_versions(user_id):
+    fields = UserProfile.CURRENT_PLAN_FIELDS
+    # Both pointers and their revisions in one query, without plan_data
+    row = UserProfile.objects.filter(user_id=user_id).values(
+        *(f"{field}_id" for field in fields.values()),
+        *(f"{field}__revision" for field in fields.values()),
+    ).first() or {}
+
+    versions = {}
+    for plan_type, field in fields.items():
+        if row.get(f"{field}_id") is not None:
+            versions[plan_type] = (row[f"{field}_id"], row[f"{field}__revision"])
+        else:
+            plan = Plan.current(user_id, plan_type)
+            versions[plan_type] = (plan.id, plan.revision) if plan else None
+    return versions
+
+
+def get_plan_versions(user):
+    """
+    {plan_type: (plan id, revision) or None} for the user's latest plans.
+    Small, so callers can key derived data on it without loading plan_data.
+    """
+    versions = cache.get(plan_versions_key(user.id))
+    if versions is None:
+        versions = _fetch_plan_versions(user.id)
+        cache.set(plan_versions_key(user.id), versions, LATEST_PLAN_TIMEOUT)
+    return versions
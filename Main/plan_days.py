@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+from django.db.models import F
+
+from Main.models import Plan, PlanRevision, UserProfile
+from Main.plan_cache import invalidate_latest_plan
+from Main.plan_schema import DAY_VALIDATORS, WEEKDAYS
+from prompts import (
+    NUTRITION_DAY_SYSTEM_MESSAGE,
+    WORKOUT_DAY_SYSTEM_MESSAGE,
+    build_plan_day_prompt,
+)
+from wrappers import rate_limit
+from wrappers.azure_chat import llm
+
+DAY_SYSTEM_MESSAGES = {
+    "workout": WORKOUT_DAY_SYSTEM_MESSAGE,
+    "nutrition": NUTRITION_DAY_SYSTEM_MESSAGE,
+}
+
+
+class PlanDayError(Exception):
+    pass
+
+
+class PlanChangedError(PlanDayError):
+    """The plan was edited by another request while this day was generated."""
+
+
+def generate_plan_day(profile, plan_type, plan_data, day, notes="", priority=rate_limit.BULK, user_id=None):
+    """Ask for one new week_plan entry; returns it validated."""
+    new_day = llm(
+        build_plan_day_prompt(profile, plan_type, plan_data, day, notes),
+        system_message=DAY_SYSTEM_MESSAGES[plan_type],
+        cache=False,
+        priority=priority,
+        endpoint=f"{plan_type}_day",
+        user_id=user_id,
+    )
+    if isinstance(new_day, dict) and "error" in new_day:
+        raise PlanDayError(new_day["error"])
+    if not isinstance(new_day, dict):
+        raise PlanDayError("Model returned an invalid day")
+
+    new_day["day"] = day
+    errors = DAY_VALIDATORS[plan_type](new_day)
+    if errors:
+        raise PlanDayError("; ".join(errors[:3]))
+    return new_day
+
+
+def fill_plan_days(profile, plan_type, plan_data, days, user_id=None):
+    """
+    Re-ask only for the given (missing or invalid) days, in parallel, and
+    return plan_data with a clean Monday-Sunday week_plan.
+    """
+    by_day = {
+        d["day"]: d
+        for d in plan_data.get("week_plan", [])
+        if isinstance(d, dict) and d.get("day") in WEEKDAYS and d.get("day") not in days
+    }
+    with ThreadPoolExecutor(max_workers=len(days)) as pool:
+        new_days = pool.map(
+            lambda day: generate_plan_day(
+                profile, plan_type, plan_data, day,
+                "This day was missing or invalid in the plan; write it.",
+                user_id=user_id,
+            ),
+            days,
+        )
+        by_day.update(zip(days, new_days))
+
+    return {**plan_data, "week_plan": [by_day[day] for day in WEEKDAYS]}
+
+
+def regenerate_plan_day(plan, day, notes="", priority=rate_limit.INTERACTIVE):
+    """
+    Regenerate one week_plan entry of plan with a day-sized prompt and patch
+    it into the plan in place, recording the old day as a PlanRevision.
+    Returns the new day.
+    """
+    day = day.strip().capitalize()
+    if day not in WEEKDAYS:
+        raise PlanDayError(f"Unknown day: {day}")
+
+    week_plan = plan.plan_data.get("week_plan", []) if isinstance(plan.plan_data, dict) else []
+    index = next(
+        (i for i, d in enumerate(week_plan) if isinstance(d, dict) and d.get("day") == day), None
+    )
+    if index is None:
+        raise PlanDayError(f"{day} is not in this plan")
+
+    profile = UserProfile.objects.get(user_id=plan.user_id)
+    new_day = generate_plan_day(
+        profile, plan.plan_type, plan.plan_data, day, notes,
+        priority=priority, user_id=plan.user_id,
+    )
+
+    revision = plan.revision
+    plan_data = {**plan.plan_data, "week_plan": list(week_plan)}
+    plan_data["week_plan"][index] = new_day
+
+    with transaction.atomic():
+        # Compare-and-set on revision so concurrent edits don't overwrite
+        # each other's day
+        updated = Plan.objects.filter(pk=plan.pk, revision=revision).update(
+            plan_data=plan_data, revision=F("revision") + 1
+        )
+        if not updated:
+            raise PlanChangedError("The plan changed while this day was generated; please retry")
+
+        PlanRevision.objects.create(
+            plan=plan, revision=revision + 1, day=day, previous_data=week_plan[index], notes=notes
+        )
+        # update() sends no post_save, so drop the cached copy here
+        invalidate_latest_plan(plan.user_id, plan.plan_type)
+
+    plan.plan_data = plan_data
+    plan.revision = revision + 1
+    return new_day
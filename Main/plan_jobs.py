@@ -0,0 +1,300 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from Main.models import Plan, PlanJob, UserProfile
+from Main.plan_days import PlanDayError, fill_plan_days
+from Main.plan_schema import invalid_days, validate_daily_targets, validate_plan
+from prompts import (
+    build_workout_prompt,
+    WORKOUT_SYSTEM_MESSAGE,
+    build_nutrition_prompt,
+    NUTRITION_SYSTEM_MESSAGE,
+    generate_nutrition_plan,
+)
+from wrappers.azure_chat import llm
+
+# More broken days than this and the whole week is regenerated instead
+MAX_REPAIRED_DAYS = 3
+
+
+class PlanGenerationError(Exception):
+    pass
+
+
+def generate_plan(user, plan_type, payload, cache=True):
+    """Call the model for one plan and return the parsed plan_data."""
+    profile = UserProfile.objects.get(user=user)
+
+    if plan_type == "workout":
+        user_prompt = build_workout_prompt(
+            user_profile=profile,
+            current_goal=payload.get("goal", ""),
+            schedule=payload.get("schedule", ""),
+            notes=payload.get("notes", ""),
+        )
+        system_message = WORKOUT_SYSTEM_MESSAGE
+    elif plan_type == "nutrition" and settings.NUTRITION_GENERATION_MODE == "fanout":
+        plan_data = generate_nutrition_plan(
+            profile,
+            current_goal=payload.get("goal", ""),
+            notes=payload.get("notes", ""),
+            cache=cache,
+            user_id=user.id,
+        )
+        return _checked(plan_type, plan_data, profile, user.id)
+    elif plan_type == "nutrition":
+        user_prompt = build_nutrition_prompt(
+            user_profile=profile,
+            current_goal=payload.get("goal", ""),
+            notes=payload.get("notes", ""),
+        )
+        system_message = NUTRITION_SYSTEM_MESSAGE
+    else:
+        raise PlanGenerationError(f"Unknown plan type: {plan_type}")
+
+    plan_data = llm(
+        user_prompt,
+        system_message=system_message,
+        cache=cache,
+        endpoint=plan_type,
+        user_id=user.id,
+    )
+    return _checked(plan_type, plan_data, profile, user.id)
+
+
+def _checked(plan_type, plan_data, profile, user_id):
+    """
+    Validate a generated plan. A few bad or missing days are re-asked on
+    their own rather than regenerating the whole week.
+    """
+    if isinstance(plan_data, dict) and "error" in plan_data:
+        raise PlanGenerationError(plan_data["error"])
+    if not isinstance(plan_data, dict) or not isinstance(plan_data.get("week_plan"), list):
+        raise PlanGenerationError("Model returned an invalid plan")
+    if plan_type == "nutrition" and validate_daily_targets(plan_data.get("daily_targets")):
+        raise PlanGenerationError("Model returned invalid daily targets")
+
+    bad_days = invalid_days(plan_type, plan_data)
+    if len(bad_days) > MAX_REPAIRED_DAYS:
+        raise PlanGenerationError(f"Model returned {len(bad_days)} invalid days")
+    if bad_days:
+        print(f"Re-asking {plan_type} days: {', '.join(bad_days)}")
+        try:
+            plan_data = fill_plan_days(profile, plan_type, plan_data, bad_days, user_id=user_id)
+        except PlanDayError as e:
+            raise PlanGenerationError(f"Could not repair plan: {e}")
+
+    errors = validate_plan(plan_type, plan_data)
+    if errors:
+        raise PlanGenerationError("; ".join(errors[:3]))
+    return plan_data
+
+
+def _generate_in_thread(user, plan_type, payload, cache):
+    try:
+        return generate_plan(user, plan_type, payload, cache=cache)
+    finally:
+        # Pool threads open their own DB connection for the profile lookup
+        connection.close()
+
+
+def generate_plans(user, plan_types, payload, cache=True):
+    """Generate several plans concurrently; returns {plan_type: plan_data}."""
+    with ThreadPoolExecutor(max_workers=len(plan_types)) as pool:
+        futures = {
+            plan_type: pool.submit(_generate_in_thread, user, plan_type, payload, cache)
+            for plan_type in plan_types
+        }
+        return {plan_type: future.result() for plan_type, future in futures.items()}
+
+
+def active_job(user, plan_type):
+    """The queued/running job that will produce this plan, if any."""
+    plan_types = [plan_type] if plan_type == "bootstrap" else [plan_type, "bootstrap"]
+    return PlanJob.objects.filter(
+        user=user, plan_type__in=plan_types, status__in=PlanJob.ACTIVE_STATUSES
+    ).first()
+
+
+def _queue_payload(user, plan_type, payload):
+    """
+    Put payload on the not-yet-started job for this (user, plan_type),
+    queueing one if needed. A running job has already read its inputs, so
+    the new ones wait behind it rather than being dropped.
+    """
+    queued = PlanJob.objects.filter(user=user, plan_type=plan_type, status="queued")
+    if not queued.update(payload=payload, updated_at=timezone.now()):
+        try:
+            with transaction.atomic():
+                return PlanJob.objects.create(user=user, plan_type=plan_type, payload=payload)
+        except IntegrityError:
+            # Another request queued one first; this payload is the newer one
+            queued.update(payload=payload, updated_at=timezone.now())
+    return queued.first() or active_job(user, plan_type)
+
+
+def enqueue_plan_job(user, plan_type, payload=None):
+    """
+    Queue a plan generation, or return the job already queued/running for
+    this (user, plan_type). A payload (regenerate inputs) always reaches a
+    job that hasn't started: it replaces a queued one's, or is queued
+    behind the running or bootstrap job.
+    """
+    if payload:
+        job = _queue_payload(user, plan_type, payload)
+    else:
+        own_jobs = PlanJob.objects.filter(
+            user=user, plan_type=plan_type, status__in=PlanJob.ACTIVE_STATUSES
+        )
+        # A bootstrap job will produce this plan too
+        job = own_jobs.first() or active_job(user, plan_type)
+        if job is None:
+            try:
+                with transaction.atomic():
+                    job = PlanJob.objects.create(user=user, plan_type=plan_type)
+            except IntegrityError:
+                # Another request queued the same job first
+                job = own_jobs.first()
+
+    if job and settings.PLAN_JOBS_EAGER:
+        claimed = claim_job(job)
+        if claimed:
+            run_job(claimed)
+        job.refresh_from_db()
+    return job
+
+
+def enqueue_bootstrap_job(user):
+    """
+    Queue a new user's first plans as one job, so both are generated in
+    parallel instead of one per tab visit. Plans that exist are skipped.
+    """
+    missing = [
+        plan_type
+        for plan_type, _ in Plan.PLAN_TYPES
+        if not Plan.objects.filter(user=user, plan_type=plan_type).exists()
+    ]
+    if not missing:
+        return None
+    job = active_job(user, "bootstrap")
+    return job or enqueue_plan_job(user, "bootstrap", {"plan_types": missing})
+
+
+def claim_job(job, visibility_timeout=None):
+    """
+    Mark job as running if it is still claimable. Uses the attempt count
+    as a version, so two workers can't both claim it. A user's jobs run
+    one at a time, in order: a regenerate job queued behind a bootstrap
+    one must not finish first and then have its plan replaced.
+    """
+    now = timezone.now()
+    timeout = visibility_timeout or settings.PLAN_JOBS_VISIBILITY_TIMEOUT
+    users_busy = PlanJob.objects.filter(status="running").exclude(pk=job.pk).values("user_id")
+    claimed = PlanJob.objects.filter(
+        pk=job.pk, attempts=job.attempts, status__in=PlanJob.ACTIVE_STATUSES
+    ).exclude(user_id__in=users_busy).update(
+        status="running",
+        attempts=job.attempts + 1,
+        locked_until=now + timedelta(seconds=timeout),
+        updated_at=now,
+    )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def claim_next_job(visibility_timeout=None):
+    """
+    Claim the oldest due job. Running jobs whose visibility timeout passed
+    (the worker died) become claimable again.
+    """
+    now = timezone.now()
+    users_busy = PlanJob.objects.filter(status="running", locked_until__gte=now).values("user_id")
+    candidates = PlanJob.objects.filter(
+        Q(status="queued", available_at__lte=now)
+        | Q(status="running", locked_until__lt=now)
+    ).exclude(user_id__in=users_busy).order_by("available_at")[:10]
+
+    for job in candidates:
+        claimed = claim_job(job, visibility_timeout)
+        if claimed:
+            return claimed
+    return None
+
+
+def run_job(job):
+    """Generate and save the plan for a claimed job; reschedule on failure."""
+    # First-visit plans for identical profiles can share a cached reply. An
+    # explicit regeneration must not, and neither may a retry: the cached
+    # reply could be the invalid one that failed the previous attempt.
+    cache = job.attempts == 1 and not job.payload.get("regenerate", False)
+    if job.plan_type == "bootstrap":
+        plan_types = [
+            plan_type
+            for plan_type in job.payload.get("plan_types") or [t for t, _ in Plan.PLAN_TYPES]
+            # e.g. a regenerate job ran while this one waited to retry
+            if not Plan.objects.filter(user=job.user, plan_type=plan_type).exists()
+        ]
+        if not plan_types:
+            _finish(job, status="done", error="", locked_until=None)
+            return job
+    else:
+        plan_types = [job.plan_type]
+
+    try:
+        if len(plan_types) == 1:
+            plans = {plan_types[0]: generate_plan(job.user, plan_types[0], job.payload, cache=cache)}
+        else:
+            plans = generate_plans(job.user, plan_types, job.payload, cache=cache)
+    except Exception as e:
+        print(f"[PlanJob {job.pk}] attempt {job.attempts}/{job.max_attempts} failed: {e}")
+        if job.attempts >= job.max_attempts:
+            outcome = {"status": "failed", "locked_until": None}
+        else:
+            outcome = {
+                "status": "queued",
+                "available_at": timezone.now() + timedelta(
+                    seconds=settings.PLAN_JOBS_RETRY_DELAY * job.attempts
+                ),
+            }
+        try:
+            with transaction.atomic():
+                _finish(job, **outcome, error=str(e))
+        except IntegrityError:
+            # A newer request for this plan was queued meanwhile; it takes over
+            _finish(job, status="failed", locked_until=None, error=str(e))
+        return job
+
+    # Bootstrap plans are saved together, so the dashboard never shows one
+    # new plan next to a missing other
+    with transaction.atomic():
+        if not _finish(job, status="done", error="", locked_until=None):
+            return job
+        created = [
+            Plan.create_current(job.user, plan_type, plan_data)
+            for plan_type, plan_data in plans.items()
+        ]
+        job.plan = created[0]
+        PlanJob.objects.filter(pk=job.pk).update(plan=job.plan)
+    return job
+
+
+def _finish(job, **fields):
+    """
+    Write the outcome of this attempt, unless the visibility timeout ran
+    out and another worker has claimed the job since. Returns whether it
+    was written.
+    """
+    finished = PlanJob.objects.filter(
+        pk=job.pk, status="running", attempts=job.attempts
+    ).update(**fields, updated_at=timezone.now())
+    if not finished:
+        print(f"[PlanJob {job.pk}] attempt {job.attempts} lost its claim; dropping its result")
+    job.refresh_from_db()
+    return bool(finished)
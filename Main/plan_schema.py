@@ -0,0 +1,209 @@
+"""
+Shape checks for the plan JSON described in WORKOUT_SYSTEM_MESSAGE and
+NUTRITION_SYSTEM_MESSAGE. Each validator returns a list of error strings;
+an empty list means the data is usable by the dashboard templates.
+
+The schemas below are compiled once at import into nested check
+functions, so validating a whole week is a single pass with no schema
+interpretation per call.
+"""
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+NUMBER = "number"
+
+
+class Nullable:
+    """The key may be missing or null; otherwise it must match spec."""
+
+    def __init__(self, spec):
+        self.spec = spec
+
+
+class ListOf:
+    def __init__(self, spec, min_items=0):
+        self.spec = spec
+        self.min_items = min_items
+
+
+class OneOf:
+    def __init__(self, *choices):
+        self.choices = frozenset(choices)
+
+
+def _compile(spec):
+    """Turn a schema spec into check(value, path, errors)."""
+    if spec == NUMBER:
+        def check(value, path, errors):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                errors.append(f"{path} must be a number")
+        return check
+
+    if spec is str:
+        def check(value, path, errors):
+            if not isinstance(value, str):
+                errors.append(f"{path} must be a string")
+        return check
+
+    if isinstance(spec, OneOf):
+        choices = spec.choices
+
+        def check(value, path, errors):
+            if value not in choices:
+                errors.append(f"{path} has unexpected value {value!r}")
+        return check
+
+    if isinstance(spec, Nullable):
+        inner = _compile(spec.spec)
+
+        def check(value, path, errors):
+            if value is not None:
+                inner(value, path, errors)
+        return check
+
+    if isinstance(spec, ListOf):
+        inner = _compile(spec.spec)
+        min_items = spec.min_items
+
+        def check(value, path, errors):
+            if not isinstance(value, list):
+                errors.append(f"{path} must be a list")
+                return
+            if len(value) < min_items:
+                errors.append(f"{path} needs at least {min_items} item(s)")
+            for i, item in enumerate(value):
+                inner(item, f"{path}[{i}]", errors)
+        return check
+
+    if isinstance(spec, dict):
+        fields = [
+            (key, _compile(sub), isinstance(sub, Nullable)) for key, sub in spec.items()
+        ]
+
+        def check(value, path, errors):
+            if not isinstance(value, dict):
+                errors.append(f"{path} must be an object")
+                return
+            for key, check_field, optional in fields:
+                if key not in value:
+                    if not optional:
+                        errors.append(f"{path}.{key} is missing")
+                    continue
+                check_field(value[key], f"{path}.{key}", errors)
+        return check
+
+    raise TypeError(f"Unsupported schema spec: {spec!r}")
+
+
+def compile_schema(spec, root):
+    check = _compile(spec)
+
+    def validate(value):
+        errors = []
+        check(value, root, errors)
+        return errors
+    return validate
+
+
+DAILY_TARGETS = {
+    "calorie_target": NUMBER,
+    "protein_g": NUMBER,
+    "carbs_g": NUMBER,
+    "fat_g": NUMBER,
+}
+
+NUTRITION_DAY = {
+    "day": OneOf(*WEEKDAYS),
+    "meals": ListOf({
+        "name": str,
+        "items": ListOf({
+            "food": str,
+            "portion": str,
+            "calories": NUMBER,
+            "protein_g": NUMBER,
+            "carbs_g": NUMBER,
+            "fat_g": NUMBER,
+            "notes": Nullable(str),
+        }, min_items=1),
+        "meal_total_calories": Nullable(NUMBER),
+    }, min_items=1),
+    "day_total_calories": NUMBER,
+    "notes": Nullable(str),
+}
+
+WORKOUT_DAY = {
+    "day": OneOf(*WEEKDAYS),
+    "recommended_time": Nullable(str),
+    "focus": OneOf("Push", "Pull", "Legs", "Upper", "Lower", "Full Body", "Cardio", "Core", "Rest"),
+    "session_type": OneOf("Workout", "Cardio", "Rest"),
+    "exercises": ListOf({
+        "name": str,
+        "sets": Nullable(NUMBER),
+        "reps": Nullable(NUMBER),
+        "distance_m": Nullable(NUMBER),
+        "notes": Nullable(str),
+    }),
+    "notes": Nullable(str),
+}
+
+validate_daily_targets = compile_schema(DAILY_TARGETS, "daily_targets")
+validate_nutrition_day = compile_schema(NUTRITION_DAY, "day")
+validate_workout_day = compile_schema(WORKOUT_DAY, "day")
+
+DAY_VALIDATORS = {
+    "workout": validate_workout_day,
+    "nutrition": validate_nutrition_day,
+}
+
+
+def invalid_days(plan_type, plan_data):
+    """Weekdays whose week_plan entry is missing, duplicated or invalid."""
+    validate_day = DAY_VALIDATORS[plan_type]
+    valid = {}
+    bad = set()
+    for day in plan_data.get("week_plan", []):
+        name = day.get("day") if isinstance(day, dict) else None
+        if name in valid or validate_day(day):
+            bad.add(name)
+        else:
+            valid[name] = day
+    return [d for d in WEEKDAYS if d in bad or d not in valid]
+
+
+def validate_plan(plan_type, plan_data):
+    if not isinstance(plan_data, dict):
+        return ["plan must be an object"]
+    if not isinstance(plan_data.get("week_plan"), list):
+        return ["week_plan must be a list"]
+
+    errors = []
+    if plan_type == "nutrition":
+        errors.extend(validate_daily_targets(plan_data.get("daily_targets")))
+
+    validate_day = DAY_VALIDATORS[plan_type]
+    for i, day in enumerate(plan_data["week_plan"]):
+        errors.extend(f"week_plan[{i}]{e[3:]}" for e in validate_day(day))
+
+    missing = invalid_days(plan_type, plan_data) if not errors else []
+    if missing:
+        errors.append(f"week_plan has missing or repeated days: {', '.join(missing)}")
+    return errors
+
+
+def is_renderable(plan_type, plan_data):
+    """
+    Whether the dashboard templates can show this plan. Looser than
+    validate_plan: older plans predate daily_targets.
+    """
+    if not isinstance(plan_data, dict) or not isinstance(plan_data.get("week_plan"), list):
+        return False
+    validate_day = DAY_VALIDATORS[plan_type]
+    return not any(validate_day(day) for day in plan_data["week_plan"])
+
+
+def validate_nutrition_plan(plan):
+    return validate_plan("nutrition", plan)
+
+
+def validate_workout_plan(plan):
+    return validate_plan("workout", plan)
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from Main.models import PhotoLocker, Plan
+from Main.overview import invalidate_public_posts
+from Main.plan_cache import invalidate_latest_plan
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def plan_changed(sender, instance, **kwargs):
+    invalidate_latest_plan(instance.user_id, instance.plan_type)
+
+
+@receiver(post_save, sender=PhotoLocker)
+@receiver(post_delete, sender=PhotoLocker)
+def photo_changed(sender, instance, **kwargs):
+    # Posting, deleting or changing visibility moves the day's public count
+    invalidate_public_posts(instance)
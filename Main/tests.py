@@ -1,3 +1,145 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from openai import AzureOpenAI
+
+from Main.models import ChatMessage, PhotoLocker, Plan, UserProfile
+from Main.overview import public_posts_on
+from Main.plan_jobs import generate_plans
+from Main.plan_schema import WEEKDAYS, validate_nutrition_day, validate_plan, validate_workout_day
+from prompts import (
+    NUTRITION_DAY_SYSTEM_MESSAGE,
+    WORKOUT_DAY_SYSTEM_MESSAGE,
+    build_nutrition_day_prompt,
+    build_plan_day_prompt,
+)
+from wrappers import azure_chat, fake_azure
+
+
+class HotQueryIndexTests(TestCase):
+    """
+    The per-user "latest" and feed queries must be served by an index, not
+    a table scan plus sort, once the tables are big. Checked with SQLite's
+    EXPLAIN QUERY PLAN over a synthetic dataset.
+    """
+
+    USERS = 200
+    PER_USER = 25
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        User.objects.bulk_create(User(username=f"user{i}") for i in range(cls.USERS))
+        users = list(User.objects.all())
+        cls.user = users[0]
+
+        Plan.objects.bulk_create(
+            Plan(user=user, plan_type=("workout", "nutrition")[i % 2], plan_data={"week_plan": []})
+            for user in users
+            for i in range(cls.PER_USER)
+        )
+        ChatMessage.objects.bulk_create(
+            ChatMessage(user=user, message="hi", response="hello")
+            for user in users
+            for _ in range(cls.PER_USER)
+        )
+        PhotoLocker.objects.bulk_create(
+            PhotoLocker(
+                user=user,
+                image="user_photos/x.jpg",
+                visibility="public" if i % 5 == 0 else "private",
+            )
+            for user in users
+            for i in range(cls.PER_USER)
+        )
+        # auto_now_add fills in one timestamp; spread them over a month
+        for i, photo in enumerate(PhotoLocker.objects.only("id")):
+            PhotoLocker.objects.filter(pk=photo.pk).update(uploaded_at=now - timedelta(hours=i % 720))
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN output is SQLite specific")
+        plan = queryset.explain()
+        self.assertIn(f"INDEX {index_name}", plan)
+        self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan)
+
+    def test_latest_plan(self):
+        queryset = Plan.objects.filter(user=self.user, plan_type="workout").order_by("-created_at")[:1]
+        self.assertUsesIndex(queryset, "plan_user_type_latest_idx")
+
+    def test_chat_history(self):
+        self.assertUsesIndex(ChatMessage.objects.filter(user=self.user)[:50], "chat_user_latest_idx")
+
+    def test_community_feed(self):
+        self.assertUsesIndex(PhotoLocker.public_photos()[:50], "photo_public_recent_idx")
+
+    def test_public_posts_today(self):
+        self.assertUsesIndex(public_posts_on(timezone.localdate()), "photo_public_recent_idx")
+
+    def test_photo_locker(self):
+        queryset = PhotoLocker.objects.filter(user=self.user).order_by("-uploaded_at")
+        self.assertUsesIndex(queryset, "photo_user_recent_idx")
+
+
+class FakeAzureTests(TestCase):
+    """The fake endpoint must answer each prompt with a reply that validates."""
+
+    def setUp(self):
+        user = User.objects.create_user("athlete")
+        self.profile = UserProfile.objects.create(user=user, age=30, fitness_goal="gain_muscle")
+
+    def reply(self, system_message, user_message):
+        return json.loads(fake_azure.canned_reply([
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message},
+        ]))
+
+    def test_day_prompts(self):
+        workout = fake_azure.workout_plan()
+        targets = fake_azure.nutrition_targets()["daily_targets"]
+        for day in WEEKDAYS:
+            with self.subTest(day=day):
+                prompt = build_plan_day_prompt(self.profile, "workout", workout, day, "")
+                reply = self.reply(WORKOUT_DAY_SYSTEM_MESSAGE, prompt)
+                self.assertEqual(reply["day"], day)
+                self.assertEqual(validate_workout_day(reply), [])
+
+                prompt = build_nutrition_day_prompt(self.profile, "", "", targets, day)
+                reply = self.reply(NUTRITION_DAY_SYSTEM_MESSAGE, prompt)
+                self.assertEqual(reply["day"], day)
+                self.assertEqual(validate_nutrition_day(reply), [])
+
+
+@override_settings(NUTRITION_GENERATION_MODE="fanout")
+class PlanGenerationTests(TransactionTestCase):
+    """
+    Both plans generated together against the fake endpoint, nutrition as
+    the per-day fan-out. Transactional: the days are fetched, and their
+    tokens recorded, from pool threads with their own connections.
+    """
+
+    def setUp(self):
+        server = fake_azure.start_server(first_token_latency=0, token_latency=0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.addCleanup(setattr, azure_chat, "client", azure_chat.client)
+        azure_chat.client = AzureOpenAI(
+            api_key="fake",
+            api_version="2024-06-01",
+            azure_endpoint=f"http://127.0.0.1:{server.server_port}",
+            max_retries=0,
+        )
+        self.user = User.objects.create_user("athlete")
+        UserProfile.objects.create(user=self.user, age=30, fitness_goal="gain_muscle")
+
+    def test_generate_plans(self):
+        plans = generate_plans(self.user, ["workout", "nutrition"], {}, cache=False)
+        self.assertEqual(validate_plan("workout", plans["workout"]), [])
+        self.assertEqual(validate_plan("nutrition", plans["nutrition"]), [])
@@ -1,9 +1,17 @@
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db.models import Sum
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.views.decorators.http import require_http_methods
-from Main.models import UserProfile, Plan, ChatMessage
-from wrappers.azure_chat import llm
+from Main.chat_context import build_chat_messages
+from Main.chat_memory import load_chat_memory, schedule_chat_memory_update
+from Main.models import UserProfile, Plan, PlanJob, ChatMessage, TokenUsage
+from Main.plan_cache import aget_latest_plan
+from Main.plan_days import PlanChangedError, PlanDayError, regenerate_plan_day
+from wrappers import llm_cache
+from wrappers.azure_chat import allm, breaker
+from wrappers.llm_metrics import metrics
 import json
 
 
@@ -13,72 +21,198 @@ def landing_view(request):
     return render(request, "landing.html")
 
 
+async def _build_chat_context(user, user_message):
+    """Return (system_prompt, conversation_history) for a coach chat turn."""
+    user_profile = await UserProfile.objects.aget(user=user)
+    user_name = user.get_full_name() or user.username
+
+    latest_workout = await aget_latest_plan(user, "workout")
+    latest_nutrition = await aget_latest_plan(user, "nutrition")
+
+    # Rolling summary plus the exchanges not folded into it yet
+    memory_summary, pairs = await load_chat_memory(user)
+
+    return build_chat_messages(
+        user_name,
+        user_profile,
+        latest_workout.plan_data if latest_workout else None,
+        latest_nutrition.plan_data if latest_nutrition else None,
+        pairs,
+        user_message,
+        timezone.localtime().strftime("%A"),
+        memory_summary,
+    )
+
+
 @login_required
 @require_http_methods(["POST"])
-def chat_api(request):
+async def chat_api(request):
     user_message = request.POST.get("message", "").strip()
 
     if not user_message:
         return JsonResponse({"error": "Empty message"}, status=400)
 
-    user_profile = UserProfile.objects.get(user=request.user)
-    user_name = request.user.get_full_name() or request.user.username
-
-    latest_workout = (
-        Plan.objects.filter(user=request.user, plan_type="workout")
-        .order_by("-created_at")
-        .first()
-    )
-
-    latest_nutrition = (
-        Plan.objects.filter(user=request.user, plan_type="nutrition")
-        .order_by("-created_at")
-        .first()
-    )
-
-    # Get last 10 messages for conversation context
-    recent_messages = ChatMessage.objects.filter(user=request.user)[:10]
-
-    # Build conversation history
-    conversation_history = []
-    for msg in reversed(list(recent_messages)):
-        conversation_history.append({"role": "user", "content": msg.message})
-        conversation_history.append({"role": "assistant", "content": msg.response})
-
-    # Add current message
-    conversation_history.append({"role": "user", "content": user_message})
-
-    # Build system prompt with user context
-    system_prompt = f"""
-    You are Physiq, an AI fitness & nutrition assistant helping {user_name}.
-    Use the user's latest saved data when answering. Be conversational and remember previous messages.
-    
-    User Profile:
-    - Age: {user_profile.age}
-    - Height: {user_profile.height}
-    - Weight: {user_profile.weight}
-    - Goal: {user_profile.fitness_goal}
-    - Activity Level: {user_profile.activity_level}
-    - Dietary Preference: {user_profile.dietary_preferences}
-    
-    Latest Workout Plan:
-    {json.dumps(latest_workout.plan_data, indent=2) if latest_workout else "None saved yet."}
-    
-    Latest Nutrition Plan:
-    {json.dumps(latest_nutrition.plan_data, indent=2) if latest_nutrition else "None saved yet."}
-    """
+    user = await request.auser()
+    system_prompt, conversation_history = await _build_chat_context(user, user_message)
 
     try:
         # Call AI with conversation history
-        response = llm(conversation_history, system_message=system_prompt)
+        response = await allm(
+            conversation_history,
+            system_message=system_prompt,
+            priority="interactive",
+            endpoint="chat",
+            user_id=user.id,
+        )
 
         # Save message and response to database
-        ChatMessage.objects.create(
-            user=request.user, message=user_message, response=response
+        await ChatMessage.objects.acreate(
+            user=user, message=user_message, response=response
         )
+        schedule_chat_memory_update(user)
 
         return JsonResponse({"response": response})
 
     except Exception as e:
         print(f"AI Error: {e}")
         return JsonResponse({"error": "Failed to get AI response"}, status=500)
+
+
+def _sse(data, event=None):
+    payload = f"data: {json.dumps(data)}\n\n"
+    if event:
+        payload = f"event: {event}\n" + payload
+    return payload
+
+
+@login_required
+@require_http_methods(["POST"])
+async def chat_stream_api(request):
+    """Same as chat_api, but streams tokens back as Server-Sent Events."""
+    user_message = request.POST.get("message", "").strip()
+
+    if not user_message:
+        return JsonResponse({"error": "Empty message"}, status=400)
+
+    user = await request.auser()
+    system_prompt, conversation_history = await _build_chat_context(user, user_message)
+
+    async def event_stream():
+        tokens = []
+        try:
+            stream = await allm(
+                conversation_history,
+                system_message=system_prompt,
+                stream=True,
+                priority="interactive",
+                endpoint="chat",
+                user_id=user.id,
+            )
+            if isinstance(stream, dict):
+                yield _sse({"error": "Failed to get AI response"}, event="error")
+                return
+
+            async for token in stream:
+                tokens.append(token)
+                yield _sse({"token": token})
+
+            response = "".join(tokens).strip()
+
+            # Save once the full reply is known
+            await ChatMessage.objects.acreate(
+                user=user, message=user_message, response=response
+            )
+            schedule_chat_memory_update(user)
+
+            yield _sse({"response": response}, event="done")
+
+        except Exception as e:
+            print(f"AI Error: {e}")
+            yield _sse({"error": "Failed to get AI response"}, event="error")
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+@require_http_methods(["POST"])
+def plan_day_api(request, plan_type):
+    """Regenerate one day of the user's latest plan, e.g. to swap Thursday."""
+    if plan_type not in dict(Plan.PLAN_TYPES):
+        return JsonResponse({"error": "Unknown plan type"}, status=404)
+
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or "{}")
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({"error": "Expected a JSON object"}, status=400)
+    else:
+        data = request.POST
+    day = data.get("day") or ""
+    notes = data.get("notes") or ""
+    if not isinstance(day, str) or not isinstance(notes, str):
+        return JsonResponse({"error": "day and notes must be strings"}, status=400)
+    notes = notes.strip()
+
+    # From the database, not the plan cache: the edit compares-and-sets
+    # on the current revision
+    plan = Plan.current(request.user.id, plan_type)
+    if not plan:
+        return JsonResponse({"error": "No plan to edit yet"}, status=404)
+
+    try:
+        new_day = regenerate_plan_day(plan, day, notes)
+    except PlanChangedError as e:
+        return JsonResponse({"error": str(e)}, status=409)
+    except PlanDayError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"plan_id": plan.id, "revision": plan.revision, "day": new_day})
+
+
+@login_required
+@require_http_methods(["GET"])
+def plan_job_status_api(request, job_id):
+    """Polled by the dashboard while a plan is being generated."""
+    job = PlanJob.objects.filter(pk=job_id, user=request.user).first()
+    if not job:
+        return JsonResponse({"error": "Job not found"}, status=404)
+
+    return JsonResponse({
+        "id": job.id,
+        "plan_type": job.plan_type,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error if job.status == "failed" else "",
+        "plan_id": job.plan_id,
+    })
+
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def llm_metrics_api(request):
+    """LLM latency, token and cost figures for this worker, plus today's ledger."""
+    today = timezone.localdate()
+    top_users = (
+        TokenUsage.objects.filter(date=today)
+        .values("user__username")
+        .annotate(
+            prompt_tokens=Sum("prompt_tokens"),
+            completion_tokens=Sum("completion_tokens"),
+            cost=Sum("cost"),
+        )
+        .order_by("-completion_tokens")[:20]
+    )
+
+    return JsonResponse({
+        **metrics.snapshot(),
+        "cache": llm_cache.cache.stats(),
+        "circuit": breaker.snapshot(),
+        "ledger_today": [
+            {**row, "cost": float(row["cost"])} for row in top_users
+        ],
+    })
@@ -5,6 +5,7 @@ from django.contrib.auth import logout
 
 from .forms import LoginForm, RegisterForm, UserProfileForm
 from .models import UserProfile
+from .plan_jobs import enqueue_bootstrap_job
 
 from django.contrib.auth import login
 
@@ -57,11 +58,17 @@ def profile_view(request):
     if request.method == "POST":
         form = UserProfileForm(request.POST, instance=profile)
         if form.is_valid():
+            was_completed = profile.profile_completed
             form.save()
 
             profile.profile_completed = profile.is_complete()
             profile.save()
 
+            # Start both first plans now, in parallel, rather than one per
+            # tab visit
+            if profile.profile_completed and not was_completed:
+                enqueue_bootstrap_job(request.user)
+
             return redirect("dashboard")
     else:
         form = UserProfileForm(instance=profile)
@@ -1,24 +1,76 @@
 from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
 from django.shortcuts import render, redirect
 from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
+import hashlib
 import random
 import json
 from django.contrib import messages
 from datetime import datetime, timedelta
 
+from django.db.models import Count, Max
 from django.utils import timezone
 
-from Main.models import UserProfile, Plan, ChatMessage, DailyProgress, PhotoLocker
-from prompts import (
-    build_workout_prompt,
-    WORKOUT_SYSTEM_MESSAGE,
-    build_nutrition_prompt,
-    NUTRITION_SYSTEM_MESSAGE,
-    generate_coach_summary,
-)
-from wrappers.azure_chat import llm
+from Main.models import PlanJob, ChatMessage, DailyProgress, PhotoLocker
+from Main.overview import get_overview, overview_version
+from Main.plan_cache import get_latest_plan
+from Main.plan_jobs import active_job, enqueue_plan_job
+from Main.plan_schema import is_renderable
+
+# Plan partial fragments are keyed by plan id and revision, so an edited
+# plan never hits an old fragment; the timeout just ages out unused ones
+PLAN_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Part of every dashboard ETag; bump it when the partial templates change
+# so browsers don't keep revalidating old markup
+DASHBOARD_ETAG_VERSION = 1
+
+# (plan_type, plan id, revision) -> is_renderable. An edit bumps the
+# revision, so a version's plan_data never changes and is checked once.
+_renderable_versions = {}
+MAX_RENDERABLE_VERSIONS = 10000
+
+
+def _etag(*parts):
+    return hashlib.md5(repr((DASHBOARD_ETAG_VERSION,) + parts).encode()).hexdigest()
+
+
+def _overview_etag(request):
+    today = timezone.localdate()
+    return _etag("overview", request.user.id, today, overview_version(request.user, today))
+
+
+def _plan_etag(plan_type):
+    def etag(request):
+        # Only tab switches are conditional; POSTs regenerate
+        if request.method != "GET":
+            return None
+        # Without a plan the view has to run, as it is what queues the job
+        plan = _latest_plan(request.user, plan_type)
+        if plan is None:
+            return None
+        # While a job runs the view shows its placeholder instead of the plan
+        job = (
+            PlanJob.objects.filter(
+                user=request.user,
+                plan_type__in=[plan_type, "bootstrap"],
+                status__in=PlanJob.ACTIVE_STATUSES,
+            )
+            .values_list("id", "status")
+            .first()
+        )
+        return _etag(
+            plan_type, request.user.id, timezone.localdate(), (plan.id, plan.revision), job
+        )
+    return etag
+
+
+def _progress_etag(request):
+    stats = DailyProgress.objects.filter(user=request.user).aggregate(
+        latest=Max("updated_at"), count=Count("id")
+    )
+    return _etag("progress", request.user.id, timezone.localdate(), stats["latest"], stats["count"])
 
 
 @login_required
@@ -29,20 +81,11 @@ def dashboard_view(request):
     )
 
 
-def _find_today_block(week_plan, weekday_name):
-    """Find today's block by day name. Falls back to first entry if not found."""
-    if not week_plan:
-        return None
-    for d in week_plan:
-        if str(d.get("day", "")).strip().lower() == weekday_name.strip().lower():
-            return d
-    return week_plan[0]
-
-
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_overview_etag)
 def overview_view(request):
     now_local = timezone.localtime()
-    weekday_name = now_local.strftime("%A")
 
     try:
         # Linux / macOS use %-d (day without leading zero)
@@ -51,79 +94,7 @@ def overview_view(request):
         # Windows fallback uses %#d instead
         pretty_date = now_local.strftime("%A, %b %#d")
 
-    latest_workout = (
-        Plan.objects.filter(user=request.user, plan_type="workout")
-        .order_by("-created_at")
-        .first()
-    )
-    latest_nutrition = (
-        Plan.objects.filter(user=request.user, plan_type="nutrition")
-        .order_by("-created_at")
-        .first()
-    )
-
-    workout_today = None
-    nutrition_today = None
-    daily_target = None
-    macro_targets = {"protein": None, "carbs": None, "fat": None}
-    meals_json = "[]"
-
-    if latest_workout and isinstance(latest_workout.plan_data, dict):
-        week_plan = latest_workout.plan_data.get("week_plan", [])
-        workout_today = _find_today_block(week_plan, weekday_name)
-
-    if latest_nutrition and isinstance(latest_nutrition.plan_data, dict):
-        ndata = latest_nutrition.plan_data
-
-        week_plan = ndata.get("week_plan", [])
-        nutrition_today = _find_today_block(week_plan, weekday_name)
-
-        daily_targets = ndata.get("daily_targets", {})
-        daily_target = daily_targets.get("calorie_target")
-
-        macro_targets = {
-            "protein": daily_targets.get("protein_g"),
-            "carbs": daily_targets.get("carbs_g"),
-            "fat": daily_targets.get("fat_g"),
-        }
-
-        if nutrition_today:
-            try:
-                meals_json = json.dumps(nutrition_today.get("meals", []))
-            except Exception:
-                meals_json = "[]"
-
-    cache_key = f"coach_summary:{request.user.id}:{now_local.date()}"
-    coach_banner = cache.get(cache_key)
-
-    if not coach_banner:
-        coach_banner = "Focus on consistency today — progress compounds."
-        try:
-            coach_banner = generate_coach_summary(
-                request.user.username,
-                workout_today,
-                nutrition_today,
-                {
-                    "protein": macro_targets.get("protein"),
-                    "carbs": macro_targets.get("carbs"),
-                    "fat": macro_targets.get("fat"),
-                    "calories": daily_target,
-                },
-            )
-        except Exception:
-            pass
-
-        tomorrow = now_local + timezone.timedelta(days=1)
-        midnight = tomorrow.replace(hour=0, minute=0, second=0, microsecond=0)
-        seconds_until_midnight = int((midnight - now_local).total_seconds())
-
-        cache.set(cache_key, coach_banner, timeout=seconds_until_midnight)
-
-    today = timezone.localdate()
-    new_posts_today = PhotoLocker.objects.filter(
-        visibility="public",
-        uploaded_at__date=today
-    ).count()
+    overview, coach_banner, new_posts_today = get_overview(request.user, now_local)
 
     return render(
         request,
@@ -131,104 +102,106 @@ def overview_view(request):
         {
             "today_str": pretty_date,
             "coach_banner": coach_banner,
-            "workout_today": workout_today,
-            "nutrition_today": nutrition_today,
-            "nutrition_meals_json": meals_json,
-            "macro_targets": macro_targets,
-            "daily_calorie_target": daily_target,
+            "workout_today": overview["workout_today"],
+            "nutrition_today": overview["nutrition_today"],
+            "nutrition_meals_json": overview["meals_json"],
+            "macro_targets": overview["macro_targets"],
+            "daily_calorie_target": overview["daily_target"],
             "view_name": "Overview",
             "new_posts_today": new_posts_today,
         },
     )
 
 
+def _latest_plan(user, plan_type):
+    """The newest plan the templates can render; a broken one counts as none."""
+    plan = get_latest_plan(user, plan_type)
+    if plan is None:
+        return None
+    key = (plan_type, plan.id, plan.revision)
+    renderable = _renderable_versions.get(key)
+    if renderable is None:
+        if len(_renderable_versions) >= MAX_RENDERABLE_VERSIONS:
+            _renderable_versions.clear()
+        renderable = _renderable_versions[key] = is_renderable(plan_type, plan.plan_data)
+    return plan if renderable else None
+
+
+def _render_plan_pending(request, job, view, view_name):
+    return render(request, "dashboard/partials/plan_pending.html", {
+        "job": job,
+        "view": view,
+        "view_name": view_name,
+    })
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_plan_etag("workout"))
 def workout_view(request):
-    user = UserProfile.objects.get(user=request.user)
-
-    latest_plan = (
-        Plan.objects.filter(user=request.user, plan_type="workout")
-        .order_by("-created_at")
-        .first()
-    )
+    latest_plan = _latest_plan(request.user, "workout")
 
+    job = None
     if request.method == "POST":
+        data = {}
         if request.headers.get("Content-Type") == "application/json":
             data = json.loads(request.body.decode("utf-8"))
-            goal = data.get("goal", "")
-            schedule = data.get("schedule", "")
-            notes = data.get("notes", "")
-
-        user_prompt = build_workout_prompt(
-            user_profile=user,
-            current_goal=goal,
-            schedule=schedule,
-            notes=notes
-        )
-        response_json = llm(user_prompt, system_message=WORKOUT_SYSTEM_MESSAGE)
-
-        Plan.objects.create(
-            user=request.user,
-            plan_type="workout",
-            plan_data=response_json
-        )
 
-        latest_plan = Plan.objects.filter(user=request.user, plan_type="workout").order_by('-created_at').first()
+        job = enqueue_plan_job(request.user, "workout", {
+            "goal": data.get("goal", ""),
+            "schedule": data.get("schedule", ""),
+            "notes": data.get("notes", ""),
+            "regenerate": True,
+        })
+    elif not latest_plan:
+        job = enqueue_plan_job(request.user, "workout")
+    else:
+        job = active_job(request.user, "workout")
 
-    if not latest_plan:
-        user_prompt = build_workout_prompt(user_profile=user, current_goal="", schedule="", notes="")
-        response_json = llm(user_prompt, system_message=WORKOUT_SYSTEM_MESSAGE)
-        latest_plan = Plan.objects.create(
-            user=request.user, plan_type="workout", plan_data=response_json
-        )
+    if job and job.status == "done":
+        # Ran inline (PLAN_JOBS_EAGER)
+        latest_plan = _latest_plan(request.user, "workout")
+    if not latest_plan or job and job.status in PlanJob.ACTIVE_STATUSES:
+        return _render_plan_pending(request, job, "workout", "Workout Planner")
 
     return render(request, "dashboard/partials/workout.html", {
         "plan": latest_plan.plan_data,
+        "plan_id": latest_plan.id,
+        "plan_revision": latest_plan.revision,
+        "fragment_timeout": PLAN_FRAGMENT_TIMEOUT,
         "view_name": "Workout Planner"
     })
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_plan_etag("nutrition"))
 def nutrition_view(request):
-    user = UserProfile.objects.get(user=request.user)
-    latest_plan = (
-        Plan.objects.filter(user=request.user, plan_type="nutrition")
-        .order_by("-created_at")
-        .first()
-    )
+    latest_plan = _latest_plan(request.user, "nutrition")
 
     if request.method == "POST":
-        user_prompt = build_nutrition_prompt(
-            user_profile=user, current_goal="", notes=""
-        )
-        response_json = llm(user_prompt, system_message=NUTRITION_SYSTEM_MESSAGE)
-        Plan.objects.create(
-            user=request.user, plan_type="nutrition", plan_data=response_json
-        )
-        latest_plan = (
-            Plan.objects.filter(user=request.user, plan_type="nutrition")
-            .order_by("-created_at")
-            .first()
-        )
-
-    if not latest_plan:
-        user_prompt = build_nutrition_prompt(
-            user_profile=user, current_goal="", notes=""
-        )
-        response_json = llm(user_prompt, system_message=NUTRITION_SYSTEM_MESSAGE)
-        latest_plan = Plan.objects.create(
-            user=request.user, plan_type="nutrition", plan_data=response_json
-        )
-
-    plan = latest_plan.plan_data
-
-    for day in plan["week_plan"]:
-        day["meals_json"] = json.dumps(day["meals"])
+        job = enqueue_plan_job(request.user, "nutrition", {"regenerate": True})
+    elif not latest_plan:
+        job = enqueue_plan_job(request.user, "nutrition")
+    else:
+        job = active_job(request.user, "nutrition")
+
+    if job and job.status == "done":
+        # Ran inline (PLAN_JOBS_EAGER)
+        latest_plan = _latest_plan(request.user, "nutrition")
+    if not latest_plan or job and job.status in PlanJob.ACTIVE_STATUSES:
+        return _render_plan_pending(request, job, "nutrition", "Nutrition Planner")
 
     return render(
         request,
         "dashboard/partials/nutrition.html",
-        {"plan": plan, "view_name": "Nutrition Planner"},
+        {
+            "plan": latest_plan.plan_data,
+            "plan_id": latest_plan.id,
+            "plan_revision": latest_plan.revision,
+            "fragment_timeout": PLAN_FRAGMENT_TIMEOUT,
+            "view_name": "Nutrition Planner",
+        },
     )
 
 
@@ -344,6 +317,8 @@ def calculate_streaks(user):
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_progress_etag)
 def progress_view(request):
     today = timezone.localtime().date()
 
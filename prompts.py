@@ -1,6 +1,10 @@
 # WORKOUT PROMPT
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
 from Main.models import Plan
-from wrappers.azure_chat import llm
+from Main.plan_schema import WEEKDAYS, validate_daily_targets, validate_nutrition_day
+from wrappers.azure_chat import forget_cached_reply, llm
 import json
 
 WORKOUT_SYSTEM_MESSAGE = """
@@ -278,7 +282,238 @@ def build_nutrition_prompt(user_profile, current_goal, notes):
     """
 
 
-def generate_coach_summary(username, workout_today, nutrition_today, targets):
+# Fan-out nutrition generation: targets once, then one small call per day
+NUTRITION_TARGETS_SYSTEM_MESSAGE = """
+You are Physiq — an expert AI nutrition coach.
+You must output ONLY valid JSON with no commentary or markdown.
+
+GOAL
+Set the user's daily nutrition targets. The meals are planned separately.
+
+JSON SCHEMA (must match exactly)
+{
+  "daily_targets": {
+    "calorie_target": number,
+    "protein_g": number,
+    "carbs_g": number,
+    "fat_g": number
+  },
+  "encouragement_message": "string"
+}
+
+DAILY TARGET RULES
+- Base calories on the user’s goal (fat loss, muscle gain, maintenance).
+- Protein target: 0.7–1g per lb of estimated body weight.
+- Carbs/fats shift depending on goal:
+  • Fat loss → moderate carbs, moderate fats
+  • Muscle gain → higher carbs
+  • Maintenance → balanced
+- No extreme dieting or unsafe calorie levels.
+
+OUTPUT
+Return ONLY the JSON object. No markdown, no extra text.
+"""
+
+NUTRITION_DAY_SYSTEM_MESSAGE = """
+You are Physiq — an expert AI nutrition coach.
+You must output ONLY valid JSON with no commentary or markdown.
+
+GOAL
+Plan the meals for ONE day of the user's week, hitting the given daily targets.
+
+JSON SCHEMA (must match exactly)
+{
+  "day": "Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday",
+  "meals": [
+    {
+      "name": "Breakfast|Lunch|Dinner|Snack",
+      "items": [
+        {
+          "food": "string",
+          "portion": "string (e.g. '150g', '1 cup', '2 eggs', '1 medium bowl')",
+          "calories": number,
+          "protein_g": number,
+          "carbs_g": number,
+          "fat_g": number,
+          "notes": "string"
+        }
+      ],
+      "meal_total_calories": number
+    }
+  ],
+  "day_total_calories": number,
+  "notes": "string"
+}
+
+RULES
+- Breakfast, Lunch, Dinner, and at least one Snack.
+- Every food item MUST include a “portion” field.
+- Totals must be realistic, consistent, and hit or come close to the targets.
+- Snacks must contribute meaningful calories (no “1 almond”).
+- Meals must be simple and made from commonly available grocery items.
+- If the user requests halal, vegetarian, vegan, gluten-free, etc., follow strictly.
+- notes: short, simple guidance (e.g. “Eat lunch after your workout.”).
+- No medical advice.
+
+OUTPUT
+Return ONLY the JSON object. No markdown, no extra text.
+"""
+
+# Days are generated independently, so each one gets a different main
+# protein to keep the week varied
+NUTRITION_DAY_THEMES = [
+    "chicken", "salmon or other fish", "eggs and dairy", "ground turkey",
+    "tofu or legumes", "lean beef", "shrimp or tuna",
+]
+
+
+def build_nutrition_day_prompt(user_profile, current_goal, notes, daily_targets, day):
+    theme = NUTRITION_DAY_THEMES[WEEKDAYS.index(day)]
+    return f"""
+        {build_nutrition_prompt(user_profile, current_goal, notes).strip()}
+
+        Day: {day}
+        Daily targets: {json.dumps(daily_targets)}
+        Variety: build this day's main meals around {theme}, unless that conflicts with the user's diet.
+    """
+
+
+def _generate_nutrition_day(prompt, day, cache, user_id):
+    try:
+        for use_cache in (cache, False):
+            data = llm(
+                prompt,
+                system_message=NUTRITION_DAY_SYSTEM_MESSAGE,
+                cache=use_cache,
+                endpoint="nutrition_day",
+                user_id=user_id,
+            )
+            if isinstance(data, dict) and "error" not in data:
+                data["day"] = day
+                if not validate_nutrition_day(data):
+                    return data
+            if use_cache:
+                # Otherwise every later run replays the bad reply first
+                forget_cached_reply(prompt, NUTRITION_DAY_SYSTEM_MESSAGE)
+        return {"error": f"Invalid plan for {day}"}
+    finally:
+        # Runs in a pool thread; the token ledger write opened a connection
+        connection.close()
+
+
+def generate_nutrition_plan(user_profile, current_goal="", notes="", cache=True, user_id=None):
+    """
+    Fan-out version of the nutrition plan: daily_targets first, then the
+    seven days as parallel, much shorter completions, merged into the same
+    plan_data shape. Failures come back as {"error": ...} like llm().
+    """
+    targets = llm(
+        build_nutrition_prompt(user_profile, current_goal, notes),
+        system_message=NUTRITION_TARGETS_SYSTEM_MESSAGE,
+        cache=cache,
+        endpoint="nutrition_targets",
+        user_id=user_id,
+    )
+    if isinstance(targets, dict) and "error" in targets:
+        return targets
+    if not isinstance(targets, dict) or validate_daily_targets(targets.get("daily_targets")):
+        return {"error": "Invalid daily targets"}
+
+    daily_targets = targets["daily_targets"]
+    with ThreadPoolExecutor(max_workers=len(WEEKDAYS)) as pool:
+        week_plan = list(pool.map(
+            lambda day: _generate_nutrition_day(
+                build_nutrition_day_prompt(user_profile, current_goal, notes, daily_targets, day),
+                day,
+                cache,
+                user_id,
+            ),
+            WEEKDAYS,
+        ))
+
+    errors = [d["error"] for d in week_plan if "error" in d]
+    if errors:
+        return {"error": "; ".join(errors)}
+
+    return {
+        "daily_targets": daily_targets,
+        "week_plan": week_plan,
+        "encouragement_message": targets.get("encouragement_message", ""),
+    }
+
+
+# Single-day edits ("swap Thursday")
+WORKOUT_DAY_SYSTEM_MESSAGE = """
+You are Physiq – an expert AI fitness coach.
+You must output ONLY valid JSON. No commentary, no markdown, no explanations.
+
+GOAL
+Rewrite ONE day of the user's existing 7-day workout plan according to their request.
+The rest of the week stays as it is, so keep the new day consistent with it.
+
+JSON SCHEMA (match exactly)
+{
+  "day": "Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday",
+  "recommended_time": "string (e.g., '6:00 AM - 7:00 AM', or 'Flexible' on rest days)",
+  "focus": "Push|Pull|Legs|Upper|Lower|Full Body|Cardio|Core|Rest",
+  "session_type": "Workout|Cardio|Rest",
+  "exercises": [
+    {
+      "name": "string",
+      "sets": number|null,
+      "reps": number|null,
+      "distance_m": number|null,
+      "notes": "string"
+    }
+  ],
+  "notes": "string"
+}
+
+RULES
+- Rest days: focus="Rest", session_type="Rest", exercises=[], recommended_time="Flexible".
+- Training days have 3–6 exercises.
+- Resistance exercises: sets and reps are numbers, distance_m is null.
+- Cardio: sets and reps are null; give distance_m or a duration in notes.
+- No core exercises unless the user asks for core.
+- Avoid repeating the main lift of the neighbouring days.
+
+OUTPUT
+Return ONLY the JSON object for that one day.
+"""
+
+
+def build_plan_day_prompt(user_profile, plan_type, plan_data, day, notes):
+    """
+    The user message for regenerating one day: profile, a one-line outline
+    of the rest of the week, the current version of the day and the request.
+    """
+    week_plan = [d for d in plan_data.get("week_plan", []) if isinstance(d, dict)]
+    current = next((d for d in week_plan if d.get("day") == day), {})
+
+    if plan_type == "workout":
+        # Without the closing whole-week instruction
+        profile = build_workout_prompt(user_profile).rsplit("\n\n", 1)[0]
+        outline = ", ".join(f"{d.get('day')}={d.get('focus')}" for d in week_plan if d.get("day") != day)
+        context = f"Rest of the week: {outline}"
+    else:
+        profile = build_nutrition_prompt(user_profile, "", "").strip()
+        context = f"Daily targets: {json.dumps(plan_data.get('daily_targets', {}))}"
+
+    return f"""
+{profile}
+
+{context}
+
+Current {day}:
+{json.dumps(current, separators=(",", ":"))}
+
+Requested change: {notes or "Give me a different option for this day."}
+
+Return the new {day}.
+"""
+
+
+def generate_coach_summary(username, workout_today, nutrition_today, targets, user_id=None):
     # Workout summary
     if not workout_today or workout_today.get("type", "").lower() == "rest":
         workout_desc = "Rest day"
@@ -315,4 +550,28 @@ Workout today: {workout_desc}
 Tone: confident, supportive, friendly. Avoid emojis.
 """
 
-    return llm(prompt)
+    return llm(prompt, cache=True, endpoint="coach_summary", user_id=user_id)
+
+
+CHAT_MEMORY_SYSTEM_MESSAGE = """
+You maintain a running memory of a fitness coaching conversation.
+Merge the new exchanges into the existing summary.
+Keep facts that matter for future coaching: goals, injuries, preferences,
+dislikes, commitments, progress, and questions still open.
+Drop small talk. Write plain text, at most 120 words, third person ("The user...").
+"""
+
+
+def build_chat_memory_prompt(summary, pairs):
+    exchanges = "\n".join(
+        f"User: {message}\nCoach: {response}" for message, response in pairs
+    )
+    return f"""
+Existing summary:
+{summary or "(empty)"}
+
+New exchanges:
+{exchanges}
+
+Return only the updated summary.
+"""
@@ -21,8 +21,19 @@ function addMessage(text, sender) {
     chatWindow.scrollTop = chatWindow.scrollHeight;
 }
 
-function sendMessage() {
+function parseSseEvent(raw) {
+    let event = "message";
+    let data = "";
+    raw.split("\n").forEach(line => {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+    });
+    return { event, data: data ? JSON.parse(data) : {} };
+}
+
+async function sendMessage() {
     const input = document.getElementById("chat-input");
+    const chatWindow = document.getElementById("chat-window");
     let msg = input.value.trim();
     if (!msg) return;
 
@@ -30,26 +41,48 @@ function sendMessage() {
     input.value = "";
 
     addMessage("Typing...", "ai");
-    const typingBubble = document.querySelector(".bubble.ai:last-child");
-
-    fetch("/api/chat/", {
-        method: "POST",
-        headers: {
-            "X-CSRFToken": getCookie("csrftoken"),
-            "Content-Type": "application/x-www-form-urlencoded"
-        },
-        body: "message=" + encodeURIComponent(msg)
-    })
-    .then(r => r.json())
-    .then(data => {
-        typingBubble.remove();
-        addMessage(data.response, "ai");
-    })
-    .catch(err => {
+    const replyBubble = document.querySelector(".bubble.ai:last-child");
+
+    try {
+        const res = await fetch("/api/chat/stream/", {
+            method: "POST",
+            headers: {
+                "X-CSRFToken": getCookie("csrftoken"),
+                "Content-Type": "application/x-www-form-urlencoded"
+            },
+            body: "message=" + encodeURIComponent(msg)
+        });
+        if (!res.ok || !res.body) throw new Error("Stream failed");
+
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let text = "";
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE events are separated by a blank line
+            let sep;
+            while ((sep = buffer.indexOf("\n\n")) !== -1) {
+                const { event, data } = parseSseEvent(buffer.slice(0, sep));
+                buffer = buffer.slice(sep + 2);
+
+                if (event === "error") throw new Error(data.error);
+                if (event === "done") text = data.response;
+                else text += data.token || "";
+
+                replyBubble.innerHTML = marked.parse(text);
+                chatWindow.scrollTop = chatWindow.scrollHeight;
+            }
+        }
+    } catch (err) {
         console.error("Fetch error:", err);
-        typingBubble.remove();
+        replyBubble.remove();
         addMessage("Error connecting to server.", "ai");
-    });
+    }
 }
 
 function initChat() {
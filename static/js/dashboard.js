@@ -35,6 +35,8 @@ sidebarLinks.forEach(link => {
             .then(data => {
                 contentArea.innerHTML = data;
 
+                initPlanJobPolling();
+
                 if (viewName === "/chat") {
                     initChat();
                     initPromptBubbles();
@@ -114,11 +116,53 @@ function workoutModifyHandler() {
 
     // Re-bind button to new DOM
     workoutModifyHandler();
+    initPlanJobPolling();
 
     window.hideLoader?.();
   };
 }
 
+let planJobTimer = null;
+
+// Plans are generated by a background worker; while one is pending the
+// partial renders a placeholder, and we poll until the plan is ready.
+function initPlanJobPolling() {
+    clearTimeout(planJobTimer);
+
+    const pending = document.querySelector(".plan-pending[data-job-id]");
+    if (!pending) return;
+
+    const jobId = pending.dataset.jobId;
+    const view = pending.dataset.view;
+
+    const poll = async () => {
+        // Stop if the user navigated away from this placeholder
+        if (!document.body.contains(pending)) return;
+
+        try {
+            const res = await fetch(`/api/plans/jobs/${jobId}/`);
+            const job = await res.json();
+
+            if (job.status === "done") {
+                goToTab(view);
+                return;
+            }
+            if (job.status === "failed") {
+                pending.innerHTML = `
+                    <div class="alert alert-danger">
+                        We couldn't generate your plan right now. Please try again in a few minutes.
+                    </div>`;
+                return;
+            }
+        } catch (error) {
+            console.error(error);
+        }
+        planJobTimer = setTimeout(poll, 2000);
+    };
+
+    planJobTimer = setTimeout(poll, 2000);
+}
+
 function goToTab(viewName) {
     // Normalize (allow "workout" or "/workout")
     const target = viewName.startsWith("/") ? viewName : `/${viewName}`;
@@ -51,6 +51,7 @@ function initNutrition() {
       .then(html => {
         document.getElementById('content-area').innerHTML = html;
         initNutrition();
+        initPlanJobPolling();
       })
       .finally(() => {
         if (typeof window.hideLoader === "function") hideLoader();
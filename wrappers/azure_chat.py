@@ -1,9 +1,28 @@
 import os
 import json
 import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
 
 from dotenv import load_dotenv
-from openai import APIError, APITimeoutError, AzureOpenAI
+from openai import (
+    APIConnectionError,
+    APIError,
+    APIStatusError,
+    APITimeoutError,
+    AzureOpenAI,
+    AsyncAzureOpenAI,
+    RateLimitError,
+)
+
+from asgiref.sync import sync_to_async
+
+from wrappers import llm_cache, rate_limit
+from wrappers.circuit_breaker import CircuitBreaker
+from wrappers.json_repair import looks_like_json, repair_json
+from wrappers.llm_metrics import CallStats, metrics
+from wrappers.singleflight import AsyncSingleFlight, SingleFlight
 
 load_dotenv()
 
@@ -11,17 +30,39 @@ client = AzureOpenAI(
     api_key=os.getenv("AZURE_OPENAI_API_KEY"),
     api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
     azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+    # Retries are handled below so they respect the limiter and breaker
+    max_retries=0,
+)
+
+async_client = AsyncAzureOpenAI(
+    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+    api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+    max_retries=0,
 )
 
 DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 
-def llm(
-    user_message,
-    system_message: str = "You are a helpful fitness AI coach.",
-    temperature: float = 0.2,
-    retries: int = 3,
-    retry_delay: float = 2.0,
-):
+# How long another worker may hold the cross-process lock for a prompt
+# before followers give up waiting and call Azure themselves.
+FLIGHT_LOCK_TTL = float(os.getenv("LLM_FLIGHT_LOCK_TTL", 60))
+FLIGHT_POLL_INTERVAL = 0.2
+
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+
+# Longest server-requested wait we will sit through before failing the call
+MAX_RETRY_WAIT = float(os.getenv("LLM_MAX_RETRY_WAIT", 20))
+
+breaker = CircuitBreaker(
+    "azure_openai",
+    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", 5)),
+    reset_timeout=float(os.getenv("LLM_BREAKER_RESET", 30)),
+)
+breaker.add_listener(metrics.record_transition)
+
+
+def _build_messages(user_message, system_message):
     messages = [{"role": "system", "content": system_message}]
 
     if isinstance(user_message, str):
@@ -31,30 +72,464 @@ def llm(
     else:
         raise ValueError("user_message must be a string or list of messages")
 
+    return messages
+
+
+def _parse_reply(ai_reply):
+    ai_reply = ai_reply.strip()
+
+    # Try to parse as JSON, fallback to string
+    try:
+        return json.loads(ai_reply)
+    except json.JSONDecodeError:
+        pass
+
+    # Fenced, truncated or slightly malformed JSON is patched locally
+    # instead of paying for another completion
+    if looks_like_json(ai_reply):
+        try:
+            return repair_json(ai_reply)
+        except ValueError:
+            pass
+    return ai_reply
+
+
+def _delta_text(chunk):
+    if chunk.choices and chunk.choices[0].delta.content:
+        return chunk.choices[0].delta.content
+    return None
+
+
+def _note_delta(stats, text):
+    if stats.ttft is None:
+        stats.ttft = time.monotonic() - stats.started
+    # Streams carry no usage block; ~4 characters per token is close enough
+    stats.completion_chars += len(text)
+
+
+def _iter_deltas(response, stats, on_close):
+    try:
+        for chunk in response:
+            text = _delta_text(chunk)
+            if text:
+                _note_delta(stats, text)
+                yield text
+    finally:
+        on_close()
+
+
+async def _aiter_deltas(response, stats, on_close):
+    try:
+        async for chunk in response:
+            text = _delta_text(chunk)
+            if text:
+                _note_delta(stats, text)
+                yield text
+    finally:
+        await sync_to_async(on_close)()
+
+
+def _note_usage(stats, response):
+    usage = getattr(response, "usage", None)
+    stats.ttft = time.monotonic() - stats.started
+    stats.prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    stats.completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    return getattr(usage, "total_tokens", None)
+
+
+def _record(endpoint, stats, user_id, result=None):
+    if isinstance(result, dict) and "error" in result:
+        stats.error = True
+    if stats.completion_chars and not stats.completion_tokens:
+        stats.completion_tokens = stats.completion_chars // 4
+    metrics.record(endpoint, stats, time.monotonic() - stats.started, user_id=user_id)
+
+
+RATE_LIMITED = {"error": "AI is busy right now, please try again shortly."}
+
+
+def _circuit_open():
+    return {
+        "error": "AI service is temporarily unavailable.",
+        "circuit_open": True,
+        "retry_in": round(breaker.retry_in(), 1),
+    }
+
+
+def _retry_after(e):
+    """Seconds the server asked us to wait, from retry-after(-ms) headers."""
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            value = headers["retry-after"]
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _is_outage(e):
+    """Connection problems, timeouts and 5xx count against the breaker."""
+    if isinstance(e, (APIConnectionError, APITimeoutError, ConnectionError)):
+        return True
+    if isinstance(e, APIStatusError):
+        return e.status_code >= 500 or e.status_code == 408
+    return False
+
+
+def _on_error(e, attempt, retries, retry_delay):
+    """
+    Record a failed attempt and return how long to wait before retrying,
+    or None when the call should give up now.
+    """
+    if isinstance(e, RateLimitError):
+        # Quota is shared, so every worker waits out the hint via the limiter
+        print(f"[AzureOpenAI] Rate limited: {e} (attempt {attempt + 1}/{retries})")
+        hint = _retry_after(e)
+        rate_limit.limiter.drain(hint)
+        breaker.release_probe()
+        if attempt >= retries - 1 or (hint or 0) > MAX_RETRY_WAIT:
+            return None
+        return 0.0
+    elif _is_outage(e):
+        print(f"[AzureOpenAI] Error: {e} (attempt {attempt + 1}/{retries})")
+        breaker.record_failure()
+    else:
+        # Bad request, auth, content filter... retrying won't help
+        print(f"[AzureOpenAI] Request rejected: {e}")
+        breaker.release_probe()
+        return None
+
+    if attempt >= retries - 1:
+        return None
+
+    delay = _retry_after(e)
+    if delay is None:
+        # Full jitter keeps workers from retrying in lockstep
+        delay = random.uniform(0, retry_delay * (2**attempt))
+    if delay > MAX_RETRY_WAIT:
+        return None
+    return delay
+
+
+def _use_cache(cache, stream):
+    if stream:
+        return False
+    return llm_cache.CACHE_BY_DEFAULT if cache is None else cache
+
+
+def _cacheable(result):
+    return result is not None and not (isinstance(result, dict) and "error" in result)
+
+
+def _complete(messages, temperature, retries, retry_delay, stream, priority, stats, on_stream_end=None):
+    estimate = rate_limit.estimate_tokens(messages)
+
     for attempt in range(retries):
+        if not breaker.allow():
+            return _circuit_open()
+
+        lease = rate_limit.limiter.acquire(priority, estimate, rate_limit.ACQUIRE_TIMEOUT)
+        if lease is None:
+            breaker.release_probe()
+            return dict(RATE_LIMITED)
+
+        stats.attempts += 1
+        used_tokens = None
         try:
             response = client.chat.completions.create(
                 model=DEPLOYMENT_NAME,
                 messages=messages,
                 temperature=temperature,
+                stream=stream,
             )
+            breaker.record_success()
 
-            ai_reply = response.choices[0].message.content.strip()
+            if stream:
+                # The stream owns the lease until the last chunk is read
+                stream_lease, lease = lease, None
 
-            # Try to parse as JSON, fallback to string
-            try:
-                return json.loads(ai_reply)
-            except json.JSONDecodeError:
-                return ai_reply
-
-        except (APIError, APITimeoutError, ConnectionError) as e:
-            print(f"[AzureOpenAI] Error: {e} (attempt {attempt + 1}/{retries})")
-            if attempt < retries - 1:
-                time.sleep(retry_delay * (2**attempt))
-                continue
-            return {"error": f"AI request failed after {retries} attempts: {str(e)}"}
+                def close():
+                    rate_limit.limiter.release(stream_lease)
+                    on_stream_end()
+
+                stats.prompt_tokens = estimate - rate_limit.COMPLETION_ESTIMATE
+                return _iter_deltas(response, stats, close)
+
+            used_tokens = _note_usage(stats, response)
+            return _parse_reply(response.choices[0].message.content)
+
+        except (APIError, ConnectionError) as e:
+            delay = _on_error(e, attempt, retries, retry_delay)
+            if delay is None:
+                return {"error": f"AI request failed after {attempt + 1} attempts: {str(e)}"}
+        except Exception as e:
+            print(f"[AzureOpenAI] Unexpected error: {e}")
+            breaker.release_probe()
+            return {"error": str(e)}
+        finally:
+            if lease:
+                rate_limit.limiter.release(lease, estimate, used_tokens)
+
+        time.sleep(delay)
+
+    return None
+
+
+def _flight(stats, fn):
+    """
+    fn for a SingleFlight. Only the leader runs it; the other callers got a
+    copy of its reply without an Azure request, so they are recorded as
+    cached rather than as zero-token calls.
+    """
+    stats.cached = True
+
+    def run():
+        stats.cached = False
+        return fn()
+
+    return run
+
+
+def _cached_complete(messages, temperature, retries, retry_delay, priority, stats, key, cache_ttl):
+    cached = llm_cache.cache.get(key)
+    if cached is not None:
+        stats.cached = True
+        return cached
+
+    def load():
+        # A flight that just finished may already have filled the cache
+        shared = llm_cache.cache.get(key, count=False)
+        if shared is not None:
+            stats.cached = True
+            return shared
+
+        # Another worker process may be generating the same reply; wait
+        # for it to land in the shared cache instead of paying twice.
+        if not llm_cache.cache.acquire_lock(key, FLIGHT_LOCK_TTL):
+            while llm_cache.cache.lock_held(key):
+                time.sleep(FLIGHT_POLL_INTERVAL)
+            shared = llm_cache.cache.get(key, count=False)
+            if shared is not None:
+                stats.cached = True
+                return shared
+            llm_cache.cache.acquire_lock(key, FLIGHT_LOCK_TTL)
+
+        try:
+            result = _complete(messages, temperature, retries, retry_delay, False, priority, stats)
+            if _cacheable(result):
+                llm_cache.cache.set(key, result, ttl=cache_ttl)
+            return result
+        finally:
+            llm_cache.cache.release_lock(key)
+
+    return _flights.do(key, _flight(stats, load))
+
+
+def llm(
+    user_message,
+    system_message: str = "You are a helpful fitness AI coach.",
+    temperature: float = 0.2,
+    retries: int = 3,
+    retry_delay: float = 2.0,
+    stream: bool = False,
+    cache: bool | None = None,
+    cache_ttl: int | None = None,
+    priority: str = rate_limit.BULK,
+    endpoint: str = "other",
+    user_id: int | None = None,
+):
+    """
+    With stream=True, returns a generator of text deltas instead of the
+    parsed reply. Retries only cover opening the stream.
+
+    cache=True/False opts a call in or out of the shared response cache
+    (LLM_CACHE_DEFAULT decides when left as None). Streams are never cached.
+
+    Concurrent identical calls are coalesced into one Azure request; with
+    caching on, this extends across worker processes via a lock in the
+    shared cache.
+
+    priority picks the rate-limiter lane: "interactive" for user-facing chat,
+    "bulk" (default) for plan generation and summaries.
+
+    endpoint and user_id label the call in llm_metrics and the token ledger.
+    """
+    messages = _build_messages(user_message, system_message)
+    stats = CallStats()
+
+    if stream:
+        result = _complete(
+            messages, temperature, retries, retry_delay, True, priority, stats,
+            on_stream_end=lambda: _record(endpoint, stats, user_id),
+        )
+        if isinstance(result, dict):
+            _record(endpoint, stats, user_id, result)
+        return result
+
+    key = llm_cache.make_key(DEPLOYMENT_NAME, system_message, messages, temperature)
+
+    if _use_cache(cache, stream):
+        result = _cached_complete(
+            messages, temperature, retries, retry_delay, priority, stats, key, cache_ttl
+        )
+    else:
+        # Identical calls already in flight in this process share one request
+        result = _flights.do(key, _flight(
+            stats,
+            lambda: _complete(messages, temperature, retries, retry_delay, False, priority, stats),
+        ))
+
+    _record(endpoint, stats, user_id, result)
+    return result
+
+
+def forget_cached_reply(user_message, system_message, temperature: float = 0.2):
+    """Drop the cached reply for this prompt, e.g. after it failed validation."""
+    messages = _build_messages(user_message, system_message)
+    llm_cache.cache.delete(llm_cache.make_key(DEPLOYMENT_NAME, system_message, messages, temperature))
+
+
+async def _acomplete(messages, temperature, retries, retry_delay, stream, priority, stats, on_stream_end=None):
+    estimate = rate_limit.estimate_tokens(messages)
+
+    for attempt in range(retries):
+        if not breaker.allow():
+            return _circuit_open()
+
+        lease = await rate_limit.limiter.aacquire(
+            priority, estimate, rate_limit.ACQUIRE_TIMEOUT
+        )
+        if lease is None:
+            breaker.release_probe()
+            return dict(RATE_LIMITED)
+
+        stats.attempts += 1
+        used_tokens = None
+        try:
+            response = await async_client.chat.completions.create(
+                model=DEPLOYMENT_NAME,
+                messages=messages,
+                temperature=temperature,
+                stream=stream,
+            )
+            breaker.record_success()
+
+            if stream:
+                stream_lease, lease = lease, None
+
+                def close():
+                    rate_limit.limiter.release(stream_lease)
+                    on_stream_end()
+
+                stats.prompt_tokens = estimate - rate_limit.COMPLETION_ESTIMATE
+                return _aiter_deltas(response, stats, close)
+
+            used_tokens = _note_usage(stats, response)
+            return _parse_reply(response.choices[0].message.content)
+
+        except (APIError, ConnectionError) as e:
+            delay = await asyncio.to_thread(_on_error, e, attempt, retries, retry_delay)
+            if delay is None:
+                return {"error": f"AI request failed after {attempt + 1} attempts: {str(e)}"}
         except Exception as e:
             print(f"[AzureOpenAI] Unexpected error: {e}")
+            breaker.release_probe()
             return {"error": str(e)}
+        finally:
+            if lease:
+                await asyncio.to_thread(
+                    rate_limit.limiter.release, lease, estimate, used_tokens
+                )
+
+        await asyncio.sleep(delay)
 
     return None
+
+
+async def _acached_complete(messages, temperature, retries, retry_delay, priority, stats, key, cache_ttl):
+    cached = await asyncio.to_thread(llm_cache.cache.get, key)
+    if cached is not None:
+        stats.cached = True
+        return cached
+
+    async def load():
+        shared = await asyncio.to_thread(llm_cache.cache.get, key, False)
+        if shared is not None:
+            stats.cached = True
+            return shared
+
+        if not await asyncio.to_thread(llm_cache.cache.acquire_lock, key, FLIGHT_LOCK_TTL):
+            while await asyncio.to_thread(llm_cache.cache.lock_held, key):
+                await asyncio.sleep(FLIGHT_POLL_INTERVAL)
+            shared = await asyncio.to_thread(llm_cache.cache.get, key, False)
+            if shared is not None:
+                stats.cached = True
+                return shared
+            await asyncio.to_thread(llm_cache.cache.acquire_lock, key, FLIGHT_LOCK_TTL)
+
+        try:
+            result = await _acomplete(messages, temperature, retries, retry_delay, False, priority, stats)
+            if _cacheable(result):
+                await asyncio.to_thread(llm_cache.cache.set, key, result, cache_ttl)
+            return result
+        finally:
+            await asyncio.to_thread(llm_cache.cache.release_lock, key)
+
+    return await _async_flights.do(key, _flight(stats, load))
+
+
+async def allm(
+    user_message,
+    system_message: str = "You are a helpful fitness AI coach.",
+    temperature: float = 0.2,
+    retries: int = 3,
+    retry_delay: float = 2.0,
+    stream: bool = False,
+    cache: bool | None = None,
+    cache_ttl: int | None = None,
+    priority: str = rate_limit.BULK,
+    endpoint: str = "other",
+    user_id: int | None = None,
+):
+    """
+    Async counterpart of llm(). Waits on the event loop instead of a worker
+    thread, so async views can serve many conversations concurrently.
+    With stream=True, returns an async generator of text deltas.
+    """
+    messages = _build_messages(user_message, system_message)
+    stats = CallStats()
+    record = sync_to_async(_record)
+
+    if stream:
+        result = await _acomplete(
+            messages, temperature, retries, retry_delay, True, priority, stats,
+            on_stream_end=lambda: _record(endpoint, stats, user_id),
+        )
+        if isinstance(result, dict):
+            await record(endpoint, stats, user_id, result)
+        return result
+
+    key = llm_cache.make_key(DEPLOYMENT_NAME, system_message, messages, temperature)
+
+    if _use_cache(cache, stream):
+        result = await _acached_complete(
+            messages, temperature, retries, retry_delay, priority, stats, key, cache_ttl
+        )
+    else:
+        result = await _async_flights.do(key, _flight(
+            stats,
+            lambda: _acomplete(messages, temperature, retries, retry_delay, False, priority, stats),
+        ))
+
+    await record(endpoint, stats, user_id, result)
+    return result
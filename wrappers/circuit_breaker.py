@@ -0,0 +1,91 @@
+import time
+import threading
+from collections import Counter
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls
+    for reset_timeout seconds, then lets a single probe through (half-open).
+    A successful probe closes the circuit; a failed one re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.transitions = Counter()
+        self._probe_in_flight = False
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, fn):
+        """fn(name, old_state, new_state) is called on every transition."""
+        self._listeners.append(fn)
+
+    def _transition(self, new_state):
+        old_state, self.state = self.state, new_state
+        self.transitions[f"{old_state}->{new_state}"] += 1
+        print(f"[CircuitBreaker] {self.name}: {old_state} -> {new_state}")
+        for fn in self._listeners:
+            try:
+                fn(self.name, old_state, new_state)
+            except Exception as e:
+                print(f"[CircuitBreaker] listener failed: {e}")
+
+    def allow(self):
+        """Whether a call may go out now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self._transition(HALF_OPEN)
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def retry_in(self):
+        """Seconds until the next probe is allowed (0 when closed)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def release_probe(self):
+        """Give up a probe slot without judging the endpoint (e.g. a 400)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_in": round(self.retry_in(), 1),
+            "transitions": dict(self.transitions),
+        }
@@ -0,0 +1,302 @@
+"""
+Local stand-in for the Azure OpenAI chat-completions API, for benchmarks
+and load tests without spending quota. Replies are canned, schema-valid
+plans picked by looking at the system message; latency is simulated per
+output token so that long completions are slow like the real thing.
+
+Run it and point the app at it:
+
+    python -m wrappers.fake_azure --port 8081 --rate-limit-ratio 0.05
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8081 python manage.py runserver
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_PATTERN = re.compile(r"(?:Day:|Return the new)\s*(" + "|".join(WEEKDAYS) + ")")
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+
+def nutrition_targets():
+    return {
+        "daily_targets": {"calorie_target": 2600, "protein_g": 170, "carbs_g": 300, "fat_g": 80},
+        "encouragement_message": "Fuel the work you put in.",
+    }
+
+
+def nutrition_day(day):
+    def item(food, portion, calories, protein, carbs, fat):
+        return {
+            "food": food, "portion": portion, "calories": calories,
+            "protein_g": protein, "carbs_g": carbs, "fat_g": fat, "notes": "",
+        }
+
+    meals = [
+        {"name": "Breakfast", "items": [
+            item("Oats", "80g", 300, 10, 54, 6),
+            item("Greek yogurt", "200g", 200, 20, 8, 8),
+            item("Blueberries", "1 cup", 85, 1, 21, 0),
+        ]},
+        {"name": "Lunch", "items": [
+            item("Chicken breast", "180g", 300, 56, 0, 6),
+            item("Rice", "1.5 cups", 320, 6, 70, 1),
+            item("Broccoli", "1 cup", 55, 4, 11, 1),
+        ]},
+        {"name": "Dinner", "items": [
+            item("Salmon", "170g", 350, 36, 0, 22),
+            item("Sweet potato", "250g", 215, 4, 50, 0),
+            item("Mixed greens with olive oil", "1 bowl", 160, 2, 6, 14),
+        ]},
+        {"name": "Snack", "items": [
+            item("Peanut butter toast", "2 slices", 380, 16, 36, 18),
+            item("Banana", "1 medium", 105, 1, 27, 0),
+        ]},
+    ]
+    for meal in meals:
+        meal["meal_total_calories"] = sum(i["calories"] for i in meal["items"])
+    return {
+        "day": day,
+        "meals": meals,
+        "day_total_calories": sum(m["meal_total_calories"] for m in meals),
+        "notes": "Drink an extra bottle of water today.",
+    }
+
+
+def nutrition_plan():
+    return {
+        **nutrition_targets(),
+        "week_plan": [nutrition_day(day) for day in WEEKDAYS],
+    }
+
+
+def workout_plan():
+    focus = ["Push", "Cardio", "Pull", "Rest", "Legs", "Rest", "Rest"]
+    week = []
+    for day, f in zip(WEEKDAYS, focus):
+        if f == "Rest":
+            week.append({
+                "day": day, "recommended_time": "Flexible", "focus": "Rest",
+                "session_type": "Rest", "exercises": [], "notes": "Light walk and stretching.",
+            })
+        elif f == "Cardio":
+            week.append({
+                "day": day, "recommended_time": "6:00 AM - 7:00 AM", "focus": "Cardio",
+                "session_type": "Cardio",
+                "exercises": [
+                    {"name": "Easy run", "sets": None, "reps": None, "distance_m": 5000, "notes": "Zone 2"},
+                ],
+                "notes": "Keep it conversational.",
+            })
+        else:
+            week.append({
+                "day": day, "recommended_time": "5:30 PM - 6:30 PM", "focus": f,
+                "session_type": "Workout",
+                "exercises": [
+                    {"name": f"{f} main lift", "sets": 4, "reps": 6, "distance_m": None, "notes": ""},
+                    {"name": f"{f} accessory", "sets": 3, "reps": 12, "distance_m": None, "notes": ""},
+                    {"name": f"{f} isolation", "sets": 3, "reps": 15, "distance_m": None, "notes": ""},
+                ],
+                "notes": "Controlled tempo.",
+            })
+    return {"week_plan": week, "encouragement_message": "One session at a time."}
+
+
+def canned_reply(messages):
+    """Pick a reply shaped like what the calling prompt asks for."""
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    user = messages[-1]["content"] if messages else ""
+
+    if "ONE day" in system:
+        match = DAY_PATTERN.search(user)
+        day = match.group(1) if match else "Monday"
+        # The nutrition day prompt mentions workouts too; only the workout
+        # day schema has session_type
+        if '"session_type"' in system:
+            return json.dumps(workout_plan()["week_plan"][WEEKDAYS.index(day)])
+        return json.dumps(nutrition_day(day))
+    if "daily nutrition targets" in system:
+        return json.dumps(nutrition_targets())
+    if "7-day nutrition" in system:
+        return json.dumps(nutrition_plan())
+    if "7-day workout" in system:
+        return json.dumps(workout_plan())
+    return "Great work so far — keep showing up and the results will follow."
+
+
+class FakeAzureHandler(BaseHTTPRequestHandler):
+    # Overridden per server by start_server()
+    first_token_latency = 0.3
+    token_latency = 0.01
+    rate_limit_ratio = 0.0
+    retry_after = 1.0
+    stats = None
+    rng = random.Random()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _count(self, key):
+        with self.stats["lock"]:
+            self.stats[key] += 1
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_rate_limited(self):
+        self._count("rate_limited")
+        self._send_json(
+            429,
+            {"error": {
+                "code": "429",
+                "message": f"Rate limit is exceeded. Try again in {self.retry_after:g} seconds.",
+            }},
+            {
+                "Retry-After": str(max(1, round(self.retry_after))),
+                "retry-after-ms": str(int(self.retry_after * 1000)),
+            },
+        )
+
+    def _chunk(self, body, delta, finish_reason=None):
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    def _stream(self, body, content, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send(data):
+            self.wfile.write(f"data: {data}\n\n".encode())
+            self.wfile.flush()
+
+        time.sleep(self.first_token_latency)
+        send(json.dumps(self._chunk(body, {"role": "assistant", "content": ""})))
+        # Four characters is roughly one token; send a few tokens per chunk
+        for i in range(0, len(content), 16):
+            piece = content[i:i + 16]
+            time.sleep(estimate_tokens(piece) * self.token_latency)
+            send(json.dumps(self._chunk(body, {"content": piece})))
+        send(json.dumps(self._chunk(body, {}, "stop")))
+        if body.get("stream_options", {}).get("include_usage"):
+            send(json.dumps({**self._chunk(body, {}), "choices": [], "usage": usage}))
+        send("[DONE]")
+
+    def do_POST(self):
+        if not self.path.split("?")[0].endswith("/chat/completions"):
+            self._send_json(404, {"error": {"code": "404", "message": "Not found"}})
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        self._count("requests")
+        if self.rng.random() < self.rate_limit_ratio:
+            self._send_rate_limited()
+            return
+
+        messages = body.get("messages", [])
+        content = canned_reply(messages)
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = estimate_tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+        if body.get("stream"):
+            self._stream(body, content, usage)
+            return
+
+        time.sleep(self.first_token_latency + completion_tokens * self.token_latency)
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": usage,
+        })
+
+
+def start_server(
+    host="127.0.0.1",
+    port=0,
+    first_token_latency=0.3,
+    token_latency=0.01,
+    rate_limit_ratio=0.0,
+    retry_after=1.0,
+    seed=None,
+):
+    """
+    Serve fake completions from a background thread; returns the server.
+    Its endpoint URL is f"http://{host}:{server.server_port}".
+    """
+    handler = type("Handler", (FakeAzureHandler,), {
+        "first_token_latency": first_token_latency,
+        "token_latency": token_latency,
+        "rate_limit_ratio": rate_limit_ratio,
+        "retry_after": retry_after,
+        "stats": {"lock": threading.Lock(), "requests": 0, "rate_limited": 0},
+        "rng": random.Random(seed),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--first-token-latency", type=float, default=0.3, help="Seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Seconds per output token")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429s, in seconds")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    print(
+        f"Fake Azure OpenAI on http://{args.host}:{args.port} "
+        f"(set AZURE_OPENAI_ENDPOINT to this URL)"
+    )
+    server = start_server(
+        args.host, args.port, args.first_token_latency, args.token_latency,
+        args.rate_limit_ratio, args.retry_after, args.seed,
+    )
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stats = server.RequestHandlerClass.stats
+        print(f"\nServed {stats['requests']} requests, {stats['rate_limited']} rate limited")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import json
+import re
+
+FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*(?:```)?$", re.S | re.I)
+CLOSERS = {"{": "}", "[": "]"}
+
+# How many cut points to try when the tail of a truncated reply is broken
+MAX_CUTS = 50
+
+
+def looks_like_json(text):
+    text = text.lstrip()
+    return text.startswith("{") or text.lower().startswith("```json")
+
+
+def _scan(text):
+    """
+    One pass over text: drop trailing commas, and record each comma outside
+    a string together with the brackets open at that point. Returns
+    (cleaned_text, open_brackets, in_string, cut_points).
+    """
+    out = []
+    stack = []
+    cuts = []
+    in_string = False
+    escaped = False
+
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in CLOSERS:
+            stack.append(ch)
+        elif ch in "}]":
+            # Trailing comma before a closer: {"a": 1,}
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            if not stack:
+                # End of the top-level object; ignore any text after it
+                out.append(ch)
+                break
+        elif ch == ",":
+            cuts.append((len(out), list(stack)))
+        out.append(ch)
+
+    return "".join(out), stack, in_string, cuts
+
+
+def _close(text, stack):
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    elif text.endswith(":"):
+        text += " null"
+    return text + "".join(CLOSERS[b] for b in reversed(stack))
+
+
+def repair_json(text):
+    """
+    Best-effort parse of slightly malformed or truncated model JSON: strips
+    markdown fences and text around the object, drops trailing commas and
+    closes whatever was left open, backing off to the last complete member
+    when the tail is unusable. Raises ValueError when nothing parses.
+    """
+    text = text.strip()
+    match = FENCE.match(text)
+    if match:
+        text = match.group(1)
+
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object found")
+    text = text[start:]
+
+    cleaned, stack, in_string, cuts = _scan(text)
+
+    candidates = [_close(cleaned + ('"' if in_string else ""), stack)]
+    for position, open_brackets in reversed(cuts[-MAX_CUTS:]):
+        candidates.append(_close(cleaned[:position], open_brackets))
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("Could not repair JSON")
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "llm_cache.sqlite3"
+
+
+def make_key(deployment, system_message, messages, temperature):
+    """Content address for a completion request."""
+    payload = json.dumps(
+        [deployment, system_message, messages, temperature],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed response cache shared by every process on the host.
+    Entries expire after a TTL; once the table grows past max_entries the
+    least recently read ones are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, ttl=86400, max_entries=5000):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_accessed_at"
+                " ON llm_cache (accessed_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_locks ("
+                " key TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key, count=True):
+        """
+        Return the cached reply, or None on a miss. count=False leaves the
+        hit/miss counters alone, for re-reads of a lookup already counted.
+        """
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+
+        if row is None:
+            if count:
+                self._count(hit=False)
+            return None
+
+        conn.execute(
+            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        if count:
+            self._count(hit=True)
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at)"
+            " VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + (ttl or self.ttl), now),
+        )
+        self.evict()
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+    def evict(self):
+        """Drop expired entries, then the least recently used overflow."""
+        conn = self._connect()
+        conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        (size,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = size - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def acquire_lock(self, key, ttl):
+        """
+        Take the cross-process lock for key. The lock expires after ttl
+        seconds so a crashed holder can't block other workers forever.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "DELETE FROM llm_locks WHERE key = ? AND expires_at <= ?", (key, now)
+        )
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO llm_locks (key, expires_at) VALUES (?, ?)",
+            (key, now + ttl),
+        )
+        return cursor.rowcount == 1
+
+    def lock_held(self, key):
+        row = self._connect().execute(
+            "SELECT 1 FROM llm_locks WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def release_lock(self, key):
+        self._connect().execute("DELETE FROM llm_locks WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM llm_cache")
+
+    def stats(self):
+        (size,) = self._connect().execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+cache = LLMCache(
+    path=os.getenv("LLM_CACHE_PATH", DEFAULT_PATH),
+    ttl=int(os.getenv("LLM_CACHE_TTL", 86400)),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000)),
+)
+
+# Calls that don't pass cache=True/False follow this default
+CACHE_BY_DEFAULT = os.getenv("LLM_CACHE_DEFAULT", "0") == "1"
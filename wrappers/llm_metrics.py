@@ -0,0 +1,170 @@
+import os
+import time
+import bisect
+import threading
+from collections import Counter, defaultdict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Upper bounds in seconds; the last bucket catches everything slower
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, float("inf"))
+
+PROMPT_PRICE_PER_1K = float(os.getenv("AZURE_OPENAI_PROMPT_PRICE_PER_1K", 0))
+COMPLETION_PRICE_PER_1K = float(os.getenv("AZURE_OPENAI_COMPLETION_PRICE_PER_1K", 0))
+
+
+def call_cost(prompt_tokens, completion_tokens):
+    return (
+        prompt_tokens / 1000 * PROMPT_PRICE_PER_1K
+        + completion_tokens / 1000 * COMPLETION_PRICE_PER_1K
+    )
+
+
+class CallStats:
+    """Filled in by the request loop for one llm() call."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.attempts = 0
+        self.completion_chars = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.ttft = None
+        self.cached = False
+        self.error = False
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                str(bound): n for bound, n in zip(self.buckets, self.counts)
+            },
+        }
+
+
+class _Endpoint:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cached = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latency = Histogram()
+        self.ttft = Histogram()
+
+
+class LLMMetrics:
+    """
+    In-process aggregator for llm() calls, grouped by the calling endpoint
+    (chat, workout, nutrition, coach_summary, ...). Sinks get every record,
+    e.g. to keep a per-user token ledger.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(_Endpoint)
+        self._transitions = Counter()
+        self._sinks = []
+
+    def add_sink(self, fn):
+        """fn(record) is called after each call with a plain dict."""
+        self._sinks.append(fn)
+
+    def record(self, endpoint, stats, wall_time, user_id=None):
+        cost = call_cost(stats.prompt_tokens, stats.completion_tokens)
+
+        with self._lock:
+            e = self._endpoints[endpoint]
+            e.calls += 1
+            e.errors += int(stats.error)
+            e.cached += int(stats.cached)
+            e.retries += max(0, stats.attempts - 1)
+            e.prompt_tokens += stats.prompt_tokens
+            e.completion_tokens += stats.completion_tokens
+            e.cost += cost
+            e.latency.observe(wall_time)
+            if stats.ttft is not None:
+                e.ttft.observe(stats.ttft)
+
+        record = {
+            "endpoint": endpoint,
+            "user_id": user_id,
+            "wall_time": wall_time,
+            "ttft": stats.ttft,
+            "attempts": stats.attempts,
+            "prompt_tokens": stats.prompt_tokens,
+            "completion_tokens": stats.completion_tokens,
+            "cost": cost,
+            "cached": stats.cached,
+            "error": stats.error,
+        }
+        for fn in self._sinks:
+            try:
+                fn(record)
+            except Exception as e:
+                print(f"[LLMMetrics] sink failed: {e}")
+
+    def record_transition(self, name, old_state, new_state):
+        with self._lock:
+            self._transitions[f"{name}:{old_state}->{new_state}"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "endpoints": {
+                    name: {
+                        "calls": e.calls,
+                        "errors": e.errors,
+                        "cached": e.cached,
+                        "retries": e.retries,
+                        "prompt_tokens": e.prompt_tokens,
+                        "completion_tokens": e.completion_tokens,
+                        "cost": round(e.cost, 4),
+                        "latency": e.latency.snapshot(),
+                        "ttft": e.ttft.snapshot(),
+                    }
+                    for name, e in self._endpoints.items()
+                },
+                "circuit_transitions": dict(self._transitions),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._transitions.clear()
+
+
+metrics = LLMMetrics()
@@ -0,0 +1,260 @@
+import os
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+
+from dotenv import load_dotenv
+
+from wrappers import llm_cache
+
+load_dotenv()
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+
+# Reply budget assumed before Azure reports the real usage
+COMPLETION_ESTIMATE = 800
+
+
+def estimate_tokens(messages, completion_tokens=COMPLETION_ESTIMATE):
+    """Rough request size: ~4 characters per prompt token plus the reply."""
+    chars = sum(len(str(m.get("content") or "")) for m in messages)
+    return chars // 4 + completion_tokens
+
+
+class RateLimiter:
+    """
+    Cross-process token buckets for Azure RPM/TPM quotas plus a cap on
+    concurrent requests, kept in SQLite so every worker shares one budget.
+
+    Two lanes: interactive traffic may use the whole budget, bulk traffic
+    only bulk_share of it and never while an interactive caller is waiting.
+    """
+
+    def __init__(
+        self,
+        path=llm_cache.DEFAULT_PATH,
+        rpm=60,
+        tpm=60000,
+        max_concurrency=8,
+        bulk_share=0.7,
+        lease_ttl=120,
+    ):
+        self.path = str(path)
+        self.capacity = {"requests": float(rpm), "tokens": float(tpm)}
+        self.rate = {"requests": rpm / 60.0, "tokens": tpm / 60.0}
+        self.max_concurrency = max_concurrency
+        self.bulk_share = bulk_share
+        self.lease_ttl = lease_ttl
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rl_buckets ("
+                " name TEXT PRIMARY KEY,"
+                " level REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rl_leases ("
+                " id TEXT PRIMARY KEY,"
+                " lane TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rl_waiters ("
+                " id TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def _levels(self, conn, now):
+        levels = {}
+        for name, capacity in self.capacity.items():
+            row = conn.execute(
+                "SELECT level, updated_at FROM rl_buckets WHERE name = ?", (name,)
+            ).fetchone()
+            if row is None:
+                level = capacity
+            else:
+                level = min(capacity, row[0] + (now - row[1]) * self.rate[name])
+            levels[name] = level
+        return levels
+
+    def _store(self, conn, levels, now):
+        for name, level in levels.items():
+            conn.execute(
+                "INSERT OR REPLACE INTO rl_buckets (name, level, updated_at)"
+                " VALUES (?, ?, ?)",
+                (name, level, now),
+            )
+
+    def try_acquire(self, lane, tokens):
+        """
+        Returns (lease_id, 0) when admitted, otherwise (None, seconds to
+        wait before the budget could admit this request).
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+
+        conn = self._connect()
+        now = time.time()
+        share = 1.0 if lane == INTERACTIVE else self.bulk_share
+        cost = {"requests": 1.0, "tokens": float(tokens)}
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM rl_leases WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM rl_waiters WHERE expires_at <= ?", (now,))
+
+            if lane == BULK:
+                (waiting,) = conn.execute("SELECT COUNT(*) FROM rl_waiters").fetchone()
+                if waiting:
+                    conn.execute("COMMIT")
+                    return None, 0.25
+
+            (in_flight,) = conn.execute("SELECT COUNT(*) FROM rl_leases").fetchone()
+            if in_flight >= max(1, int(self.max_concurrency * share)):
+                conn.execute("COMMIT")
+                return None, 0.25
+
+            levels = self._levels(conn, now)
+            wait = 0.0
+            for name, level in levels.items():
+                # Bulk may not dig into the reserve kept for interactive calls
+                reserve = self.capacity[name] * (1.0 - share)
+                need = min(cost[name], self.capacity[name] * share)
+                shortfall = need - (level - reserve)
+                if shortfall > 0:
+                    wait = max(wait, shortfall / self.rate[name])
+
+            if wait > 0:
+                conn.execute("COMMIT")
+                return None, wait
+
+            for name in levels:
+                levels[name] -= cost[name]
+            self._store(conn, levels, now)
+
+            lease_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO rl_leases (id, lane, expires_at) VALUES (?, ?, ?)",
+                (lease_id, lane, now + self.lease_ttl),
+            )
+            conn.execute("COMMIT")
+            return lease_id, 0
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _add_waiter(self, lane, timeout):
+        if lane != INTERACTIVE:
+            return None
+        waiter_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO rl_waiters (id, expires_at) VALUES (?, ?)",
+            (waiter_id, time.time() + timeout),
+        )
+        return waiter_id
+
+    def _remove_waiter(self, waiter_id):
+        if waiter_id:
+            self._connect().execute("DELETE FROM rl_waiters WHERE id = ?", (waiter_id,))
+
+    def acquire(self, lane, tokens, timeout=30.0):
+        """Block until admitted; returns a lease id, or None on timeout."""
+        deadline = time.time() + timeout
+        waiter_id = None
+        try:
+            while True:
+                lease_id, wait = self.try_acquire(lane, tokens)
+                if lease_id:
+                    return lease_id
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                if waiter_id is None:
+                    waiter_id = self._add_waiter(lane, timeout)
+                time.sleep(min(wait, remaining))
+        finally:
+            self._remove_waiter(waiter_id)
+
+    async def aacquire(self, lane, tokens, timeout=30.0):
+        deadline = time.time() + timeout
+        waiter_id = None
+        try:
+            while True:
+                lease_id, wait = await asyncio.to_thread(self.try_acquire, lane, tokens)
+                if lease_id:
+                    return lease_id
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                if waiter_id is None:
+                    waiter_id = await asyncio.to_thread(self._add_waiter, lane, timeout)
+                await asyncio.sleep(min(wait, remaining))
+        finally:
+            if waiter_id:
+                await asyncio.to_thread(self._remove_waiter, waiter_id)
+
+    def release(self, lease_id, estimated_tokens=None, actual_tokens=None):
+        """
+        Free the concurrency slot and settle the token bucket against the
+        usage Azure actually reported.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM rl_leases WHERE id = ?", (lease_id,))
+            if estimated_tokens is not None and actual_tokens is not None:
+                now = time.time()
+                levels = self._levels(conn, now)
+                levels["tokens"] = min(
+                    self.capacity["tokens"],
+                    levels["tokens"] + estimated_tokens - actual_tokens,
+                )
+                self._store(conn, levels, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def drain(self, seconds=None):
+        """
+        Empty the request bucket after Azure answered 429 anyway. With a
+        server-provided retry hint, interactive callers are admitted again
+        after that many seconds; bulk callers wait for their reserve too.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            levels = self._levels(conn, now)
+            floor = 0.0 if seconds is None else 1.0 - seconds * self.rate["requests"]
+            levels["requests"] = min(levels["requests"], floor)
+            self._store(conn, levels, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+limiter = RateLimiter(
+    path=os.getenv("LLM_CACHE_PATH", llm_cache.DEFAULT_PATH),
+    rpm=int(os.getenv("AZURE_OPENAI_RPM", 60)),
+    tpm=int(os.getenv("AZURE_OPENAI_TPM", 60000)),
+    max_concurrency=int(os.getenv("AZURE_OPENAI_MAX_CONCURRENCY", 8)),
+    bulk_share=float(os.getenv("AZURE_OPENAI_BULK_SHARE", 0.7)),
+)
+
+# How long a call may queue for budget before giving up
+ACQUIRE_TIMEOUT = float(os.getenv("LLM_LIMITER_TIMEOUT", 30))